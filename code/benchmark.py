@@ -0,0 +1,835 @@
+#!/usr/bin/env python
+"""
+Benchmarks for loading and working with the data files in the cases directory
+Usage: benchmark.py <name> [<cases directory>]
+"""
+import copy
+import gc
+import glob
+import io
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import warnings
+from network import Network
+from traffic import Traffic
+from maintenance import Maintenance
+from resources import Resources
+from train_sets import TrainSets
+from incremental import IncrementalEvaluator
+import solution
+import maintenance
+import persist
+from persist import register, LoadCache, DeltaCodec, load_cases, json_load, json_loads, json_stream_load, json_dump, \
+    json_dumps, binary_load, RunList, Field
+from convert import to_binary, to_json
+try:
+    import evaluator
+    import feasibility
+except ImportError:
+    evaluator = feasibility = None  # needs numpy
+try:
+    import matplotlib
+    matplotlib.use("Agg")  # no windows
+    import plotter
+    from render import render_cases
+    from matplotlib.backend_bases import MouseEvent, PickEvent
+except ImportError:
+    plotter = None  # needs matplotlib
+
+__author__ = 'tomas.liden@liu.se'
+
+
+def case_files(cases, pattern="*.json"):
+    return sorted(glob.glob(os.path.join(cases, pattern)))
+
+
+def timed(func, *args):
+    """
+    Call func(*args) and return the elapsed (wall clock) time together with the result
+    """
+    start = time.time()
+    res = func(*args)
+    return time.time() - start, res
+
+
+def peak_memory(func, *args):
+    """
+    Peak memory in bytes allocated during func(*args), None if tracemalloc is not available
+    """
+    try:
+        import tracemalloc
+    except ImportError:
+        return None
+    tracemalloc.start()
+    try:
+        func(*args)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def deep_size(o, seen=None):
+    """
+    Approximate memory size of o in bytes, including everything it refers to (each object counted once)
+    """
+    seen = set() if seen is None else seen
+    if id(o) in seen:
+        return 0
+    seen.add(id(o))
+    size = sys.getsizeof(o)
+    if isinstance(o, dict):
+        size += sum(deep_size(k, seen) + deep_size(v, seen) for k, v in o.items())
+    elif isinstance(o, (list, tuple, set, frozenset)):
+        size += sum(deep_size(e, seen) for e in o)
+    if hasattr(o, "__dict__"):
+        size += deep_size(vars(o), seen)
+    for c in type(o).__mro__:
+        for name in c.__dict__.get("__slots__", ()):
+            name = "_%s%s" % (c.__name__, name) if name.startswith("__") else name
+            size += deep_size(getattr(o, name, None), seen)
+    return size
+
+
+def load_with(loader, filename):
+    with open(filename, "r") as fp:
+        return loader(fp)
+
+
+def canonical(o):
+    """
+    Plain JSON structure o with the Multidict items in sorted order, for comparing contents
+    """
+    if isinstance(o, dict):
+        c = {k: canonical(v) for k, v in o.items()}
+        if c.get("__class__") == "Multidict":
+            c["items"] = sorted(c["items"], key=json.dumps)
+        return c
+    elif isinstance(o, list):
+        return [canonical(e) for e in o]
+    return o
+
+
+def _mb(num_bytes):
+    return "-" if num_bytes is None else "%.1f" % (num_bytes / 1e6)
+
+
+def stream_load(cases):
+    """
+    Compare json_stream_load with json_load for all files, checking that the same objects are returned
+    """
+    print("%-36s %9s %9s %9s %9s" % ("file", "load [s]", "strm [s]", "load [MB]", "strm [MB]"))
+    tot_load = tot_stream = 0.0
+    for fn in case_files(cases):
+        t_load, obj = timed(load_with, json_load, fn)
+        t_stream, s_obj = timed(load_with, json_stream_load, fn)
+        assert json_dumps(obj) == json_dumps(s_obj), "Different objects loaded from %s" % fn
+        tot_load += t_load
+        tot_stream += t_stream
+        print("%-36s %9.4f %9.4f %9s %9s" % (os.path.basename(fn), t_load, t_stream,
+                                             _mb(peak_memory(load_with, json_load, fn)),
+                                             _mb(peak_memory(load_with, json_stream_load, fn))))
+    print("%-36s %9.4f %9.4f" % ("total", tot_load, tot_stream))
+
+
+def binary_format(cases):
+    """
+    Convert all files to the binary format and back, checking that nothing is lost,
+    and compare size and load time with the JSON files
+    """
+    bin_dir = tempfile.mkdtemp()
+    json_dir = tempfile.mkdtemp()
+    try:
+        print("%-36s %9s %9s %9s %9s" % ("file", "json [kB]", "size", "json [s]", "time"))
+        tot_size = tot_bin_size = tot_load = tot_bin_load = 0.0
+        for fn in case_files(cases):
+            bin_fn = to_binary(fn, bin_dir)
+            json_fn = to_json(bin_fn, json_dir)
+            with open(json_fn, "r") as fp:
+                expected = json.loads(json_dumps(load_with(json_load, fn)))
+                assert canonical(expected) == canonical(json.load(fp)), "Conversion of %s is not lossless" % fn
+            size, bin_size = os.path.getsize(fn), os.path.getsize(bin_fn)
+            t_load = timed(load_with, json_load, fn)[0]
+            with open(bin_fn, "rb") as fp:
+                t_bin_load = timed(binary_load, fp)[0]
+            tot_size += size
+            tot_bin_size += bin_size
+            tot_load += t_load
+            tot_bin_load += t_bin_load
+            print("%-36s %9.1f %9.3f %9.4f %9.3f" % (os.path.basename(fn), size / 1e3, float(bin_size) / size,
+                                                     t_load, t_bin_load / t_load))
+        print("%-36s %9.1f %9.3f %9.4f %9.3f" % ("total", tot_size / 1e3, tot_bin_size / tot_size,
+                                                 tot_load, tot_bin_load / tot_load))
+    finally:
+        shutil.rmtree(bin_dir)
+        shutil.rmtree(json_dir)
+
+
+def statistics(filename, lazy):
+    with open(filename, "r") as fp:
+        sol = json_load(fp, lazy)
+    return sol.obj_val(), sol.gap(), sol.time(), sol.num_cancelled()
+
+
+def lazy_load(cases):
+    """
+    Statistics-only scan of all solutions, with the normal and the lazy loading
+    """
+    print("%-36s %9s %9s %9s %9s" % ("file", "load [s]", "lazy [s]", "load [MB]", "lazy [MB]"))
+    tot_load = tot_lazy = 0.0
+    for fn in case_files(cases, "*_sol*.json"):
+        t_load, stat = timed(statistics, fn, False)
+        t_lazy, lazy_stat = timed(statistics, fn, True)
+        assert stat == lazy_stat
+        tot_load += t_load
+        tot_lazy += t_lazy
+        print("%-36s %9.4f %9.4f %9s %9s" % (os.path.basename(fn), t_load, t_lazy,
+                                             _mb(peak_memory(statistics, fn, False)),
+                                             _mb(peak_memory(statistics, fn, True))))
+    print("%-36s %9.4f %9.4f" % ("total", tot_load, tot_lazy))
+
+
+def sparse_memory(cases):
+    """
+    Memory of the train solutions with the SparseList vectors compared to expanded (dense) lists
+    """
+    print("%-36s %9s %9s" % ("file", "dense[MB]", "sparse[MB]"))
+    for fn in case_files(cases, "*_sol*.json"):
+        ts = load_with(json_load, fn).train_sol
+        sparse = deep_size(ts)
+        ts.u, ts.xy, ts.xx = [{k: list(v) for k, v in d.items()} for d in (ts.u, ts.xy, ts.xx)]
+        print("%-36s %9.2f %9.2f" % (os.path.basename(fn), deep_size(ts) / 1e6, sparse / 1e6))
+
+
+def sparse_solutions(cases, repeats=5):
+    """
+    Size and (best of repeats) load time of the solution files as given and when dumped again (with the
+    period values as RunLists or SparseLists)
+    """
+    print("%-36s %10s %10s %9s %9s" % ("file", "given [B]", "dumped [B]", "given[s]", "dumped[s]"))
+    directory = tempfile.mkdtemp()
+    try:
+        for fn in case_files(cases, "*_sol*.json"):
+            sparse_fn = os.path.join(directory, os.path.basename(fn))
+            with open(sparse_fn, "w") as fp:
+                json_dump(load_with(json_load, fn), fp)
+            t_dense, dense = min(timed(load_with, json_load, fn) for _ in range(repeats))
+            t_sparse, sparse = min(timed(load_with, json_load, sparse_fn) for _ in range(repeats))
+            assert canonical(json.loads(json_dumps(dense))) == canonical(json.loads(json_dumps(sparse)))
+            print("%-36s %10d %10d %9.4f %9.4f" % (os.path.basename(fn), os.path.getsize(fn),
+                                                   os.path.getsize(sparse_fn), t_dense, t_sparse))
+    finally:
+        shutil.rmtree(directory)
+
+
+def closed_overlaps(sol, as_runs):
+    # the (train, link) pairs occupying link l while it is closed for work
+    ts = sol.train_sol
+    closed = {l: sol.maint_sol.closed(l) for l in sol.maint_sol.y}
+    if as_runs:
+        return [(s, l) for (s, l), u in ts.u.items() if l in closed and closed[l].overlaps(RunList.where(u))]
+    closed = {l: rl.as_list() for l, rl in closed.items()}
+    return [(s, l) for (s, l), u in ts.u.items() if l in closed and any(c and v > 0.5 for c, v in zip(closed[l], u))]
+
+
+def run_lists(cases, repeats=5):
+    """
+    Finding the trains running on closed links (work periods), with RunLists and with the expanded lists
+    """
+    print("%-36s %9s %9s %9s" % ("file", "pairs", "lists[ms]", "runs[ms]"))
+    for fn in case_files(cases, "*_sol*.json"):
+        sol = load_with(json_load, fn)
+        t_lists, pairs = timed(lambda: [closed_overlaps(sol, False) for _ in range(repeats)])
+        t_runs, run_pairs = timed(lambda: [closed_overlaps(sol, True) for _ in range(repeats)])
+        assert sorted(pairs[0]) == sorted(run_pairs[0])
+        print("%-36s %9d %9.3f %9.3f" % (os.path.basename(fn), len(pairs[0]), 1e3 * t_lists / repeats,
+                                         1e3 * t_runs / repeats))
+
+
+def json_engines(cases, repeats=3):
+    """
+    Loading all files raw (without objects) and dumping the objects compact with each of the available JSON
+    backends, loading the objects (always with the json module) and dumping them indented (as json_dump does
+    by default) - best of repeats. The raw loads are timed first, without keeping the loaded objects
+    """
+    files = case_files(cases)
+    t_raw = {}
+    for name in sorted(persist.json_backends):
+        raw_loads = persist.json_backends[name].raw_loads
+        t_raw[name] = min(timed(load_each, lambda fn: load_with(lambda fp: raw_loads(fp.read()), fn), files)[0]
+                          for _ in range(repeats))
+    print("%-12s %9s %9s %12s" % ("backend", "load [s]", "dump [s]", "size [B]"))
+    t_load, objs = min(timed(load_all, lambda fn: load_with(json_load, fn), files) for _ in range(repeats))
+    expected = None
+    for name in sorted(persist.json_backends):
+        persist.set_json_backend(name)
+        t_dump, texts = min(timed(lambda: [json_dumps(o, compact=True) for o in objs]) for _ in range(repeats))
+        loaded = [canonical(json.loads(t)) for t in texts]
+        assert expected is None or loaded == expected
+        expected = loaded
+        print("%-12s %9.4f %9.4f %12d" % (name + " (raw)", t_raw[name], t_dump, sum(len(t) for t in texts)))
+    t_dump, texts = min(timed(lambda: [indented(o) for o in objs]) for _ in range(repeats))
+    print("%-12s %9.4f %9.4f %12d" % ("objects", t_load, t_dump, sum(len(t) for t in texts)))
+
+
+def indented(obj):
+    fp = io.StringIO() if sys.version_info[0] > 2 else io.BytesIO()
+    json_dump(obj, fp)
+    return fp.getvalue()
+
+
+def multidict_decoding(cases, repeats=20):
+    """
+    Loading (from memory) the N-series network, traffic and maintenance files, with the Multidict keys
+    converted generically (by tupleify) and by the key arity the fields declare - best of repeats
+    """
+    types = [Network, Traffic, Maintenance, Resources] + solution.types
+    print("%-12s %5s %11s %11s" % ("class", "files", "generic[ms]", "typed[ms]"))
+    for cls, suffix in [(Network, "nw"), (Traffic, "tr"), (Maintenance, "ma")]:
+        texts = [load_with(lambda fp: fp.read(), fn) for fn in case_files(cases, "N*_%s.json" % suffix)]
+        fields = cls.fields
+        cls.fields = tuple(Field(f.name, f.kind, None, f.element, f.pack, f.attr) for f in fields)
+        register(types)
+        try:
+            t_generic = min(timed(lambda: [json_loads(s) for s in texts])[0] for _ in range(repeats))
+        finally:
+            cls.fields = fields
+            register(types)
+        t_typed = min(timed(lambda: [json_loads(s) for s in texts])[0] for _ in range(repeats))
+        print("%-12s %5d %11.2f %11.2f" % (cls.__name__, len(texts), 1e3 * t_generic, 1e3 * t_typed))
+
+
+def largest_solutions(cases, count=3):
+    return sorted(case_files(cases, "*_sol*.json"), key=os.path.getsize)[-count:]
+
+
+def plot_view(nw, tr, ma, sol):
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")  # plt.show does nothing with Agg
+        return plotter.plot("", nw, tr, TrainSets.setup(nw, tr, 0.0), ma, None, sol)
+
+
+def drawn_view(nw, tr, ma, sol):
+    view = plot_view(nw, tr, ma, sol)
+    view.figure.canvas.draw()
+    return view
+
+
+def plot_and_close(nw, tr, ma, sol):
+    drawn_view(nw, tr, ma, sol).close()
+
+
+def click(fig, artist):
+    # as the pick event of a mouse click on artist, until drawn
+    mouse = MouseEvent("button_press_event", fig.canvas, 0, 0, button=1)
+    fig.canvas.callbacks.process("pick_event", PickEvent("pick_event", fig.canvas, mouse, artist))
+    fig.canvas.draw()
+
+
+def plot_clicks(cases):
+    """
+    Building the plot of the largest solutions, and the latency (until drawn) of clicking each link of the
+    shown route, to remove it from the train graph and to add it again
+    """
+    if plotter is None:
+        print("matplotlib is not available")
+        return
+    print("%-36s %9s %7s %9s %9s" % ("file", "build [s]", "clicks", "mean [s]", "max [s]"))
+    for fn in largest_solutions(cases):
+        name = fn.rsplit("_sol", 1)[0]
+        nw, tr, ma = [load_with(json_load, name + suffix) for suffix in ("_nw.json", "_tr.json", "_ma.json")]
+        t_build, view = timed(drawn_view, nw, tr, ma, load_with(json_load, fn))
+        network_lines = {l: line for line, l in view.links.items()}
+        latencies = [timed(click, view.figure, network_lines[l])[0] for l in list(view.plot_links) for _ in range(2)]
+        view.close()
+        print("%-36s %9.3f %7d %9.3f %9.3f" % (os.path.basename(fn), t_build, len(latencies),
+                                               sum(latencies) / len(latencies), max(latencies)))
+
+
+def pan(view, width, steps=40):
+    # to the right over the horizon, drawing each step
+    for i in range(steps):
+        x0 = i * 4.0
+        view.td_graph.set_xlim(x0, x0 + width)
+        view.figure.canvas.draw()
+
+
+def plot_pan(cases):
+    """
+    Panning the train graph of the largest solutions, the latency (until drawn) of each step when zoomed in
+    to 12 hours, showing the horizon and zoomed out to three times the horizon
+    """
+    if plotter is None:
+        print("matplotlib is not available")
+        return
+    print("%-36s %9s %9s %9s" % ("file", "12 h [s]", "full [s]", "3x [s]"))
+    for fn in largest_solutions(cases):
+        name = fn.rsplit("_sol", 1)[0]
+        nw, tr, ma = [load_with(json_load, name + suffix) for suffix in ("_nw.json", "_tr.json", "_ma.json")]
+        view = drawn_view(nw, tr, ma, load_with(json_load, fn))
+        horizon = tr.period_starts[-1] + tr.period_lengths[-1]
+        latencies = [timed(pan, view, width)[0] / 40 for width in (12.0, horizon, 3 * horizon)]
+        view.close()
+        print("%-36s %9.4f %9.4f %9.4f" % tuple([os.path.basename(fn)] + latencies))
+
+
+def plot_build(cases):
+    """
+    Building and drawing the plot of the largest solutions: the times, the number of artists in the train
+    graph and the peak memory
+    """
+    if plotter is None:
+        print("matplotlib is not available")
+        return
+    print("%-36s %9s %9s %9s %9s" % ("file", "build [s]", "draw [s]", "artists", "peak [MB]"))
+    for fn in largest_solutions(cases):
+        name = fn.rsplit("_sol", 1)[0]
+        nw, tr, ma = [load_with(json_load, name + suffix) for suffix in ("_nw.json", "_tr.json", "_ma.json")]
+        sol = load_with(json_load, fn)
+        t_build, view = timed(plot_view, nw, tr, ma, sol)
+        t_draw = timed(view.figure.canvas.draw)[0]
+        artists = len(view.td_graph.get_children())
+        view.close()
+        print("%-36s %9.3f %9.3f %9d %9s" % (os.path.basename(fn), t_build, t_draw, artists,
+                                             _mb(peak_memory(plot_and_close, nw, tr, ma, sol))))
+
+
+def plot_views(cases):
+    """
+    Showing 1, 2 and 4 views of the largest solution at once, the memory held while they are open and after
+    they have been closed (py3, tracemalloc)
+    """
+    if plotter is None:
+        print("matplotlib is not available")
+        return
+    try:
+        import tracemalloc
+    except ImportError:
+        print("tracemalloc is not available")
+        return
+    fn = largest_solutions(cases, 1)[0]
+    name = fn.rsplit("_sol", 1)[0]
+    nw, tr, ma = [load_with(json_load, name + suffix) for suffix in ("_nw.json", "_tr.json", "_ma.json")]
+    sol = load_with(json_load, fn)
+    print(os.path.basename(fn))
+    print("%-12s %9s %9s %9s" % ("views", "time [s]", "open [MB]", "closed[MB]"))
+    for n in (1, 2, 4):
+        tracemalloc.start()
+        try:
+            t_open, views = timed(lambda: [drawn_view(nw, tr, ma, sol) for _ in range(n)])
+            held = tracemalloc.get_traced_memory()[0]
+            for view in views:
+                view.close()
+            del views
+            gc.collect()
+            print("%-12d %9.3f %9s %9s" % (n, t_open, _mb(held), _mb(tracemalloc.get_traced_memory()[0])))
+        finally:
+            tracemalloc.stop()
+
+
+def batch_render(cases):
+    """
+    Rendering all solutions to png files with render_cases, in this process and with pools of 2, 4, .. worker
+    processes (up to the cores)
+    """
+    if plotter is None:
+        print("matplotlib is not available")
+        return
+    out_dir = tempfile.mkdtemp()
+    try:
+        print("%-12s %9s %9s %9s" % ("processes", "time [s]", "speedup", "images"))
+        processes = [1] + [2 ** i for i in range(1, 8) if 2 ** i <= multiprocessing.cpu_count()]
+        for p in processes:
+            t_render, images = timed(render_cases, cases, out_dir, "png", p)
+            t_serial = t_render if p == 1 else t_serial
+            print("%-12d %9.3f %9.2f %9d" % (p, t_render, t_serial / t_render, len(images)))
+    finally:
+        shutil.rmtree(out_dir)
+
+
+def sweep(filename, factors):
+    ma = load_with(json_load, filename)
+    return [ma.scale(f, f) for f in factors]
+
+
+def maintenance_costs(cases):
+    """
+    Loading and scaling (a sweep over 10 factors) of the maintenance costs, with dicts and PeriodCosts arrays
+    """
+    if not maintenance.np:
+        print("numpy is not available")
+        return
+    print("%-36s %9s %9s" % ("file", "dict [s]", "array [s]"))
+    tot_dict = tot_array = 0.0
+    factors = [0.5 + 0.1 * i for i in range(10)]
+    for fn in case_files(cases, "*_ma.json"):
+        maintenance.use_arrays = False
+        t_dict = timed(sweep, fn, factors)[0]
+        maintenance.use_arrays = True
+        t_array = timed(sweep, fn, factors)[0]
+        tot_dict += t_dict
+        tot_array += t_array
+        print("%-36s %9.4f %9.4f" % (os.path.basename(fn), t_dict, t_array))
+    print("%-36s %9.4f %9.4f" % ("total", tot_dict, tot_array))
+
+
+def synthetic_case(scale, num_periods=168, seed=0):
+    """
+    Network and traffic like L9 (a line with 25 links and 350 trains), but with scale times as many links and trains.
+    Besides the routes over the whole line each block of 25 links has its own routes (in both directions).
+    """
+    rnd = random.Random(seed)
+    num_links = 25 * scale
+    nodes = ["n%04d" % i for i in range(num_links + 1)]
+    links = tuple((nodes[i], nodes[i + 1]) for i in range(num_links))
+    route_nodes = {"0": ()}
+    for a, b in [(0, num_links)] + [(25 * i, 25 * (i + 1)) for i in range(scale)]:
+        route_nodes[nodes[a] + "-" + nodes[b]] = tuple(nodes[a:b + 1])
+        route_nodes[nodes[b] + "-" + nodes[a]] = tuple(reversed(nodes[a:b + 1]))
+    route_links = {r: tuple(tuple(sorted(n[i:i + 2])) for i in range(len(n) - 1)) for r, n in route_nodes.items()}
+    route_dirs = {r: tuple(int(n[i] < n[i + 1]) for i in range(len(n) - 1)) for r, n in route_nodes.items()}
+    nw = Network({n: (float(i) / num_links, 0.0) for i, n in enumerate(nodes)}, links, route_nodes,
+                 {l: (5, 8) for l in links}, route_links, route_nodes, route_dirs)
+    full = {1: nodes[0] + "-" + nodes[-1], 0: nodes[-1] + "-" + nodes[0]}
+    blocks = sorted(r for r in route_nodes if r != "0" and r not in full.values()) or sorted(full.values())
+    trains = tuple("S%05d" % i for i in range(350 * scale))
+    train_routes = {}
+    for i, s in enumerate(trains):
+        r = blocks[i % len(blocks)]
+        train_routes[s] = tuple(sorted(set([r, full[route_dirs[r][0]]]))) + ("0",)
+    min_link_time = {(s, r): tuple(rnd.uniform(0.03, 0.05) for _ in route_links[r])
+                     for s in trains for r in train_routes[s]}
+    r_cost = {(s, r): 10 if r == "0" else 1 for s in trains for r in train_routes[s]}
+    tr = Traffic(tuple(range(num_periods)), tuple(range(1, num_periods + 1)), (1,) * num_periods, trains,
+                 train_routes, min_link_time, {}, {s: rnd.uniform(1, num_periods) for s in trains},
+                 {s: 1 for s in trains}, {s: 0.1 for s in trains}, r_cost)
+    return nw, tr
+
+
+def train_sets(cases):
+    """
+    TrainSets.setup for the cases and for synthetic networks with up to 10 times the links and trains of L9
+    """
+    print("%-36s %9s %9s %9s" % ("case", "links", "trains", "time [s]"))
+    for fn in case_files(cases, "*_nw.json"):
+        nw = load_with(json_load, fn)
+        tr = load_with(json_load, fn.replace("_nw.json", "_tr.json"))
+        print("%-36s %9d %9d %9.4f" % (os.path.basename(fn)[:-8], len(nw.links), len(tr.trains),
+                                       timed(TrainSets.setup, nw, tr, 2.0)[0]))
+    for scale in [1, 2, 5, 10]:
+        nw, tr = synthetic_case(scale)
+        print("%-36s %9d %9d %9.4f" % ("synthetic x%d" % scale, len(nw.links), len(tr.trains),
+                                       timed(TrainSets.setup, nw, tr, 2.0)[0]))
+
+
+def scan_overlapping(tr, intervals, cyclic):
+    """
+    The overlapping periods per interval by testing all periods (as periods_overlapping did before the index)
+    """
+    b_t, d_t = tr.period_starts, tr.period_lengths
+    min_t, max_t = b_t[0], b_t[-1] + d_t[-1]
+    h = max_t - min_t
+    if not cyclic:
+        return [[t for t in tr.periods if a < b_t[t] + d_t[t] and b_t[t] < b] for a, b in intervals]
+    return [[t for t in tr.periods if (a < b_t[t] + d_t[t] or b > max_t and b_t[t] < b - h)
+             and (b_t[t] < b or a < min_t and a + h < b_t[t] + d_t[t])] for a, b in intervals]
+
+
+def single_overlapping(tr, intervals, cyclic):
+    return [list(tr.periods_overlapping(a, b, cyclic)) for a, b in intervals]
+
+
+def period_overlaps(cases):
+    """
+    Overlapping periods for one interval per train and link (cyclic), with a scan over all periods,
+    the period index (one query per interval) and the batched queries
+    """
+    print("%-36s %9s %9s %9s %9s" % ("file", "queries", "scan [s]", "index [s]", "batch [s]"))
+    for fn in case_files(cases, "*_tr.json"):
+        tr = load_with(json_load, fn)
+        nw = load_with(json_load, fn.replace("_tr.json", "_nw.json"))
+        intervals = [(tr.pref_dep[s] + i * 0.5, tr.pref_dep[s] + i * 0.5 + 2.0)
+                     for s in tr.trains for i in range(len(nw.links))]
+        t_scan, res = timed(scan_overlapping, tr, intervals, True)
+        t_index, index_res = timed(single_overlapping, tr, intervals, True)
+        t_batch, batch_res = timed(tr.periods_overlapping_batch, intervals, True)
+        assert res == index_res == batch_res
+        print("%-36s %9d %9.4f %9.4f %9.4f" % (os.path.basename(fn), len(intervals), t_scan, t_index, t_batch))
+
+
+def summed_min_dur(tr, s, r, route_nodes, num_links=-1):
+    """
+    Min duration by summing the link and node times (as Traffic.min_dur did before the cumulative tables)
+    """
+    to = num_links if num_links > 0 else len(route_nodes) - 1
+    return sum(tr.min_link_time[s, r][:to]) + sum([tr.node_time(s, n) for n in route_nodes[:to]])
+
+
+def all_min_durs(min_dur, tr, nw, repeats):
+    return [min_dur(s, r, nw.route_nodes[r], k) for _ in range(repeats) for s in tr.trains
+            for r in tr.train_routes[s] for k in range(1, len(nw.route_links[r]) + 1)]
+
+
+def min_durations(cases, repeats=5):
+    """
+    Traffic.min_dur for all trains, routes and number of links (repeated), with summing and cumulative tables
+    """
+    print("%-36s %9s %9s %9s" % ("file", "calls", "sum [s]", "table [s]"))
+    for fn in case_files(cases, "*_tr.json"):
+        tr = load_with(json_load, fn)
+        nw = load_with(json_load, fn.replace("_tr.json", "_nw.json"))
+        t_sum, res = timed(all_min_durs, lambda *args: summed_min_dur(tr, *args), tr, nw, repeats)
+        t_table, table_res = timed(all_min_durs, tr.min_dur, tr, nw, repeats)
+        assert res == table_res
+        print("%-36s %9d %9.4f %9.4f" % (os.path.basename(fn), len(res), t_sum, t_table))
+
+
+def parallel_load(cases):
+    """
+    Loading all cases with load_cases, in this process and with pools of 2, 4, .. worker processes (up to the cores)
+    """
+    types = [Network, Traffic, Maintenance, Resources] + solution.types
+    print("%-12s %9s %9s" % ("processes", "time [s]", "speedup"))
+    processes = [1] + [2 ** i for i in range(1, 8) if 2 ** i <= multiprocessing.cpu_count()]
+    for p in processes:
+        t_load = timed(load_cases, cases, types, p)[0]
+        t_serial = t_load if p == 1 else t_serial
+        print("%-12d %9.4f %9.2f" % (p, t_load, t_serial / t_load))
+
+
+def load_all(load, files):
+    return [load(fn) for fn in files]
+
+
+def load_each(load, files):
+    """
+    Load all files without keeping them (a garbage collection then does not go through the loaded objects)
+    """
+    for fn in files:
+        load(fn)
+
+
+def cached_load(cases):
+    """
+    Loading all files with json_load and with a LoadCache, when empty (cold) and when filled (warm)
+    """
+    cache = LoadCache(tempfile.mkdtemp())
+    try:
+        files = case_files(cases)
+        t_load, objs = timed(load_all, lambda fn: load_with(json_load, fn), files)
+        t_cold = timed(load_all, cache.load, files)[0]
+        cold = (cache.hits, cache.misses)
+        t_warm, warm_objs = timed(load_all, cache.load, files)
+        assert [canonical(json.loads(json_dumps(o))) for o in objs] == \
+            [canonical(json.loads(json_dumps(o))) for o in warm_objs]
+        print("%-12s %9s %9s %9s" % ("", "time [s]", "hits", "misses"))
+        print("%-12s %9.4f" % ("json_load", t_load))
+        print("%-12s %9.4f %9d %9d" % (("cold", t_cold) + cold))
+        print("%-12s %9.4f %9d %9d" % ("warm", t_warm, cache.hits - cold[0], cache.misses - cold[1]))
+    finally:
+        shutil.rmtree(cache.directory)
+
+
+def evaluation(cases, num_candidates=1000):
+    """
+    Objective evaluation of the solutions: one at a time from the Solution objects
+    and for a batch of candidates (random perturbations of the solution arrays)
+    """
+    if evaluator is None:
+        print("numpy is not available")
+        return
+    print("%-36s %9s %9s %9s" % ("file", "sol [ms]", "batch/s", "single/s"))
+    rnd = evaluator.np.random.RandomState(0)
+    for fn in case_files(cases, "*_sol*.json"):
+        name = fn.rsplit("_sol", 1)[0]
+        ev = evaluator.Evaluator(load_with(json_load, name + "_tr.json"), load_with(json_load, name + "_ma.json"))
+        sol = load_with(json_load, fn)
+        t_sol = timed(ev.evaluate, sol)[0]
+        a = ev.arrays(sol)
+        batch = {k: v + rnd.uniform(-0.1, 0.1, (num_candidates,) + v.shape) for k, v in a.items()}
+        t_batch, obj = timed(ev.objective, batch)
+        candidates = [{k: v[i] for k, v in batch.items()} for i in range(num_candidates)]
+        t_single, single_obj = timed(lambda: [ev.objective(c) for c in candidates])
+        assert evaluator.np.allclose(obj, single_obj)
+        print("%-36s %9.3f %9.0f %9.0f" % (os.path.basename(fn), 1e3 * t_sol, num_candidates / t_batch,
+                                           num_candidates / t_single))
+
+
+def feasibility_check(cases, repeats=20):
+    """
+    Feasibility checks of the solutions: setting up the checker, and checking (from the Solution objects)
+    """
+    if feasibility is None:
+        print("numpy is not available")
+        return
+    print("%-36s %9s %9s %9s" % ("file", "setup[ms]", "check[ms]", "violations"))
+    for fn in case_files(cases, "*_sol*.json"):
+        name = fn.rsplit("_sol", 1)[0]
+        nw, tr, ma = [load_with(json_load, name + ext) for ext in ["_nw.json", "_tr.json", "_ma.json"]]
+        sol = load_with(json_load, fn)
+        ts = TrainSets.setup(nw, tr, sol.opt_par["train_win"] if "train_win" in sol.opt_par else tr.period_starts[-1])
+        t_setup, checker = timed(feasibility.FeasibilityChecker, nw, tr, ma, ts)
+        t_check, violations = timed(lambda: [checker.violations(sol) for _ in range(repeats)])
+        print("%-36s %9.3f %9.3f %9d" % (os.path.basename(fn), 1e3 * t_setup, 1e3 * t_check / repeats,
+                                         len(violations[0])))
+
+
+def random_moves(ie, tr, resources, num_moves, seed=0):
+    """
+    Random moves (half of them undone): shifting trains, toggling work and (with resources) reassigning crews
+    """
+    rnd = random.Random(seed)
+    links = sorted(ie.y)
+    for _ in range(num_moves):
+        m = rnd.random()
+        if m < 0.5:
+            s = rnd.choice(tr.trains)
+            ie.shift_train(s, rnd.choice(tr.train_routes[s]), ie.dep[s] + rnd.uniform(-1.0, 1.0))
+        elif m < 0.75 or resources is None:
+            ie.toggle_work(rnd.choice(links), rnd.randrange(len(tr.periods)))
+        else:
+            l = rnd.choice(links)
+            ie.reassign_crew(l, rnd.randrange(len(tr.periods)), rnd.choice(resources.crews[l] + [None]))
+        if rnd.random() < 0.5:
+            ie.undo()
+
+
+def initial_solution(nw, tr, ma):
+    """
+    A simple start solution: all trains at their preferred departures on their first route, with
+    min link and node times, and no maintenance work
+    """
+    z, ey, ex, dep, arr = {}, {}, {}, {}, {}
+    for s in tr.trains:
+        r = tr.train_routes[s][0]
+        z[s, r] = 1.0
+        dep[s] = arr[s] = tr.pref_dep[s]
+        nodes = nw.route_nodes[r]
+        for i, l in enumerate(nw.route_links[r]):
+            ey[s, l] = dep[s] + (tr.min_dur(s, r, nodes, i) if i else 0)
+            ex[s, l] = arr[s] = ey[s, l] + tr.min_link_time[s, r][i]
+    periods = len(tr.periods)
+    ms = solution.MaintSolution({}, {l: [0.0] * periods for l in ma.work_volume},
+                                {(l, o): [0.0] * periods for l in ma.work_volume for o in ma.link_options[l]})
+    ts = solution.TrainSolution(z, ey, ex, dep, arr, {}, {}, {}, {}, {}, {})
+    return solution.Solution("initial", ts, ms, None, {}, {})
+
+
+def cancel_shift_undo(nw, tr, ma, ts, sol, res):
+    """
+    Cancel a train, shift it onto a route and undo that: the change of the objective and its difference
+    from a recomputation (both should be 0)
+    """
+    sol = copy.deepcopy(sol)
+    s = tr.trains[0]
+    for k in [k for k in sol.train_sol.z if k[0] == s]:
+        sol.train_sol.z[k] = 0.0
+    ie = IncrementalEvaluator(nw, tr, ma, ts, sol, res)
+    before = ie.objective
+    ie.shift_train(s, tr.train_routes[s][0], ie.dep[s] + 0.5)
+    ie.undo()
+    return max(abs(ie.objective - before), abs(ie.objective - ie.recompute()))
+
+
+def local_search_moves(cases, num_moves=20000):
+    """
+    Moves per second with the IncrementalEvaluator, starting from the first stored solution (or else
+    a simple initial solution), with crews from its resources (or the cr-bs resources) when there are such files,
+    assigned by solution.assign_crews unless the solution has crews.
+    The objective is checked against a recomputation, after the moves and after undoing a shift of a
+    cancelled train
+    """
+    print("%-36s %9s %9s %12s %12s" % ("case", "moves", "moves/s", "obj. diff", "cancel diff"))
+    for fn in case_files(cases, "*_tr.json"):
+        name = fn[:-len("_tr.json")]
+        nw, tr, ma = [load_with(json_load, name + ext) for ext in ["_nw.json", "_tr.json", "_ma.json"]]
+        sol_files = sorted(glob.glob(name + "_sol*.json"))
+        sol = load_with(json_load, sol_files[0]) if sol_files else initial_solution(nw, tr, ma)
+        cr = "_%s.json" % sol.opt_par.get("resources", "cr-bs")
+        res = load_with(json_load, name + cr) if os.path.exists(name + cr) else None
+        if res is not None and sol.crew_sol is None:
+            sol.crew_sol = solution.assign_crews(sol.maint_sol, res, tr.period_lengths)
+        ts = TrainSets.setup(nw, tr, sol.opt_par["train_win"] if "train_win" in sol.opt_par else tr.period_starts[-1])
+        ie = IncrementalEvaluator(nw, tr, ma, ts, sol, res)
+        t_moves = timed(random_moves, ie, tr, res, num_moves)[0]
+        obj = ie.objective
+        print("%-36s %9d %9.0f %12.2e %12.2e" % (os.path.basename(name) + ("" if sol_files else " (initial)"),
+                                                 num_moves, num_moves / t_moves, obj - ie.recompute(),
+                                                 cancel_shift_undo(nw, tr, ma, ts, sol, res)))
+
+
+def incumbents(sol, tr, num, seed=0):
+    """
+    A series of num solutions, each a small change of the one before: a few trains shifted in time and
+    some work periods switched on or off
+    """
+    rnd = random.Random(seed)
+    series = [sol]
+    for _ in range(num - 1):
+        sol = json_loads(json_dumps(series[-1]))
+        ts = sol.train_sol
+        for s in rnd.sample(tr.trains, 3):
+            shift = rnd.uniform(-0.5, 0.5)
+            ts.eO[s] += shift
+            ts.eD[s] += shift
+            for k in [k for k in ts.ey if k[0] == s]:
+                ts.ey[k] += shift
+                ts.ex[k] += shift
+        y = sol.maint_sol.y
+        for l in rnd.sample(sorted(y), 2):
+            t = rnd.randrange(len(y[l]))
+            y[l] = list(y[l])
+            y[l][t] = 1.0 - y[l][t]
+        series.append(sol)
+    return series
+
+
+def solution_series(cases, num=100):
+    """
+    Storing a series of solutions (incumbents) as full files and as deltas against the first one or
+    chained (against the previous one, with keyframes): total size, dump and reconstruction times per solution
+    and the time to load the last solution alone
+    """
+    print("%-36s %-8s %12s %9s %9s %9s %9s" % ("file", "storage", "size [B]", "ratio", "dump[ms]", "load[ms]",
+                                               "last[ms]"))
+    for fn in case_files(cases, "*_sol*.json"):
+        name = fn.rsplit("_sol", 1)[0]
+        series = incumbents(load_with(json_load, fn), load_with(json_load, name + "_tr.json"), num)
+        t_full, full = timed(lambda: [json_dumps(sol) for sol in series])
+        t_load = timed(lambda: [json_loads(s) for s in full])[0]
+        t_last = timed(json_loads, full[-1])[0]
+        expected = [canonical(json.loads(s)) for s in full[1:]]
+        full_size = sum(len(s) for s in full)
+        print("%-36s %-8s %12d %9.1f %9.3f %9.3f %9.3f" % (os.path.basename(fn), "full", full_size, 1.0,
+                                                           1e3 * t_full / num, 1e3 * t_load / num, 1e3 * t_last))
+        for chained in [False, True]:
+            codec = DeltaCodec(series[0], chained)
+            t_dump, deltas = timed(lambda: [codec.dumps(sol) for sol in series[1:]])
+            codec = DeltaCodec(series[0], chained)
+            t_load, loaded = timed(lambda: [codec.loads(d) for d in deltas])
+            assert expected == [canonical(json.loads(json_dumps(o))) for o in loaded]
+            t_last, last = timed(DeltaCodec(series[0], chained).loads_at, deltas, len(deltas) - 1)
+            assert expected[-1] == canonical(json.loads(json_dumps(last)))
+            size = len(full[0]) + sum(len(d) for d in deltas)
+            print("%-36s %-8s %12d %9.1f %9.3f %9.3f %9.3f" % ("", "chained" if chained else "delta", size,
+                                                               float(full_size) / size, 1e3 * t_dump / (num - 1),
+                                                               1e3 * t_load / (num - 1), 1e3 * t_last))
+
+
+benchmarks = {f.__name__: f for f in [stream_load, binary_format, lazy_load, sparse_memory, sparse_solutions,
+                                      run_lists, json_engines, multidict_decoding, maintenance_costs, train_sets,
+                                      period_overlaps, min_durations, parallel_load, cached_load, evaluation,
+                                      feasibility_check, local_search_moves, solution_series, plot_clicks,
+                                      plot_pan, plot_build, plot_views, batch_render]}
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] not in benchmarks:
+        print("Usage: %s <%s> [<cases directory>]" % (sys.argv[0], "|".join(sorted(benchmarks))))
+        sys.exit(1)
+    register([Network, Traffic, Maintenance, Resources] + solution.types)
+    benchmarks[sys.argv[1]](sys.argv[2] if len(sys.argv) > 2 else os.path.join(os.path.dirname(__file__), "..", "cases"))
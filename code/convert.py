@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+"""
+Conversion of data files between the JSON and the binary format
+Usage: convert.py <file or directory> <destination directory>
+Files named *.json are converted to binary (*.mwob) and vice versa
+"""
+import glob
+import os
+import sys
+from network import Network
+from traffic import Traffic
+from maintenance import Maintenance
+from resources import Resources
+import solution
+from persist import register, json_load, json_dump, binary_load, binary_dump
+
+__author__ = 'tomas.liden@liu.se'
+
+BINARY_EXT = ".mwob"
+
+
+def to_binary(filename, out_dir):
+    out = os.path.join(out_dir, os.path.splitext(os.path.basename(filename))[0] + BINARY_EXT)
+    with open(filename, "r") as fp:
+        obj = json_load(fp)
+    with open(out, "wb") as fp:
+        binary_dump(obj, fp)
+    return out
+
+
+def to_json(filename, out_dir):
+    out = os.path.join(out_dir, os.path.splitext(os.path.basename(filename))[0] + ".json")
+    with open(filename, "rb") as fp:
+        obj = binary_load(fp)
+    with open(out, "w") as fp:
+        json_dump(obj, fp)
+    return out
+
+
+def convert(filename, out_dir):
+    return to_binary(filename, out_dir) if filename.endswith(".json") else to_json(filename, out_dir)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("Usage: %s <file or directory> <destination directory>" % sys.argv[0])
+        sys.exit(1)
+    register([Network, Traffic, Maintenance, Resources] + solution.types)
+    src, dst = sys.argv[1:]
+    if os.path.isdir(src):
+        files = sorted(glob.glob(os.path.join(src, "*.json")) + glob.glob(os.path.join(src, "*" + BINARY_EXT)))
+    else:
+        files = [src]
+    if not os.path.isdir(dst):
+        os.makedirs(dst)
+    for fn in files:
+        print("%s -> %s" % (fn, convert(fn, dst)))
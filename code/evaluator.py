@@ -0,0 +1,195 @@
+#!/usr/bin/env python
+"""
+Objective evaluation of solutions, recomputing all cost components from the traffic, maintenance and
+resource data using numpy arrays. Usage: evaluator.py [<cases directory>]
+which checks the recomputed objective against the stored one for all solutions in the directory
+"""
+import os
+import sys
+import numpy as np
+from network import Network
+from traffic import Traffic
+from maintenance import Maintenance, PeriodCosts
+from resources import Resources
+import solution
+from persist import register, case_files, json_load, SparseList, RunList
+
+__author__ = 'tomas.liden@liu.se'
+
+
+def dense_rows(values, keys, num_periods):
+    """
+    A keys x periods matrix of the per period values (lists, SparseLists, RunLists or scalars) in the dict
+    values, zero for missing keys
+    """
+    m = np.zeros((len(keys), num_periods))
+    rows, cols, data = [], [], []
+    for i, k in enumerate(keys):
+        v = values.get(k)
+        if isinstance(v, SparseList):
+            if v.default:
+                m[i] = v.default
+            for j, x in v.values:
+                rows.append(i)
+                cols.append(j)
+                data.append(x)
+        elif isinstance(v, RunList):
+            for start, end in v.runs:
+                m[i, start:end] = 1.0
+        elif v is not None:
+            m[i] = v
+    m[rows, cols] = data
+    return m
+
+
+class Evaluator(object):
+    """
+    Cost vectors and matrices for the objective, set up once per problem instance.
+    The solution variables are given as arrays (see arrays) in the same order as the costs,
+    possibly with leading dimensions for evaluating many candidate solutions at once.
+    """
+
+    def __init__(self, traffic, maintenance, resources=None):
+        tr = traffic
+        ma = maintenance
+        periods = range(len(tr.periods))
+        # @formatter:off
+        self.trains = list(tr.trains)
+        self.train_routes = sorted(tr.r_cost)                               # (s, r) pairs
+        self.links = sorted(ma.work_volume)
+        self.link_options = [(l, o) for l in self.links for o in ma.link_options[l]]
+        self.r_cost = np.array([tr.r_cost[k] for k in self.train_routes], dtype=float)
+        self.t_cost = np.array([tr.t_cost[s] for s in self.trains], dtype=float)
+        self.d_cost = np.array([tr.d_cost[s] for s in self.trains], dtype=float)
+        self.pref_dep = np.array([tr.pref_dep[s] for s in self.trains], dtype=float)
+        self.y_cost = self.__matrix(ma.y_cost, [(l,) for l in self.links], periods)          # links x periods
+        self.v_cost = self.__matrix(ma.v_cost, self.link_options, periods)                  # (l, o) x periods
+        # @formatter:on
+        self.crews = []
+        self.link_crews = []
+        if resources is not None:
+            self.crews = list(resources.all_crew)
+            self.link_crews = [(l, k) for l in sorted(resources.crews) for k in resources.crews[l]]
+            self.crew_cost = resources.crew_cost
+            self.work_cost = resources.work_cost
+            self.link_cost = resources.link_cost
+        self.num_periods = len(periods)
+
+    @staticmethod
+    def __matrix(costs, keys, periods):
+        if isinstance(costs, PeriodCosts):
+            rows = [k[0] if costs.key_len == 1 else k for k in keys]
+            return costs.matrix[[costs.rows[k] for k in rows]].astype(float) if rows else np.zeros((0, len(periods)))
+        return np.array([[costs[k + (t,)] for t in periods] for k in keys], dtype=float).reshape(len(keys),
+                                                                                                  len(periods))
+
+    def arrays(self, sol):
+        """
+        The solution variables of sol as arrays, ordered as the costs
+        """
+        ts = sol.train_sol
+        ms = sol.maint_sol
+        a = {
+            "z": np.array([ts.z.get(k, 0.0) for k in self.train_routes]),
+            "eO": np.array([ts.eO[s] for s in self.trains]),
+            "eD": np.array([ts.eD[s] for s in self.trains]),
+            "y": dense_rows(ms.y, self.links, self.num_periods),
+            "v": dense_rows(ms.v, self.link_options, self.num_periods)
+        }
+        cs = sol.crew_sol
+        if cs is not None and self.crews:
+            a["q"] = np.array([cs.q.get(k, 0.0) for k in self.crews], dtype=float)
+            a["yk"] = dense_rows(cs.yk, self.crews, self.num_periods)
+            a["d"] = dense_rows(cs.d, self.link_crews, self.num_periods)
+        return a
+
+    def components(self, a):
+        """
+        The objective components for the solution arrays a (see arrays). With leading (batch) dimensions
+        in the arrays, the components are arrays with the corresponding shape.
+        """
+        c = {
+            "route": np.dot(a["z"], self.r_cost),
+            "duration": np.dot(a["eD"] - a["eO"], self.t_cost),
+            "deviation": np.dot(np.abs(a["eO"] - self.pref_dep), self.d_cost),
+            "work": (a["y"] * self.y_cost).sum(axis=(-2, -1)),
+            "setup": (a["v"] * self.v_cost).sum(axis=(-2, -1))
+        }
+        if "q" in a:
+            c["crew"] = self.crew_cost * a["q"].sum(axis=-1)
+            c["crew_work"] = self.work_cost * a["yk"].sum(axis=(-2, -1))
+            c["crew_link"] = self.link_cost * a["d"].sum(axis=(-2, -1))
+        return c
+
+    def objective(self, a):
+        return sum(self.components(a).values())
+
+    def evaluate(self, sol):
+        """
+        The objective value and its components for the solution sol
+        """
+        c = self.components(self.arrays(sol))
+        return sum(c.values()), c
+
+
+def case_solutions(cases, kinds=("tr", "ma"), crews="cr-bl"):
+    """
+    The solutions in cases as (solution name, the case objects of kinds, solution, resources), where the resources
+    are those named by opt_par["resources"] (a crew solution names its resource file, e.g. "cr-bl"), or None.
+    Each solution without crews is also given with the crews of the resource file crews (if the case has it)
+    assigned by solution.assign_crews - named <solution file>+<crews>
+    """
+    for name, files in sorted(case_files(cases).items()):
+        objs = {}
+        for k in kinds:
+            with open(files[k], "r") as fp:
+                objs[k] = json_load(fp)
+        for kind in sorted(k for k in files if k.startswith("sol")):
+            with open(files[kind], "r") as fp:
+                sol = json_load(fp)
+            res = None
+            if "resources" in sol.opt_par:
+                with open(files[sol.opt_par["resources"]], "r") as fp:
+                    res = json_load(fp)
+            sol_name = os.path.basename(files[kind])
+            yield sol_name, objs, sol, res
+            if sol.crew_sol is None and crews in files:
+                with open(files[crews], "r") as fp:
+                    res = json_load(fp)
+                sol.crew_sol = solution.assign_crews(sol.maint_sol, res, objs["tr"].period_lengths)
+                yield "%s+%s" % (sol_name, crews), objs, sol, res
+
+
+def crew_costs(cs, res):
+    """
+    The crew costs of the crew solution cs, summed directly from its variables
+    """
+    return (res.crew_cost * sum(cs.q.values()) + res.work_cost * sum(sum(w) for w in cs.yk.values()) +
+            res.link_cost * sum(sum(d) for d in cs.d.values()))
+
+
+def check(cases, rel_tol=1e-5):
+    """
+    Compare the recomputed objective with the stored objective value for all solutions in cases (with the crew
+    costs of the resources named by opt_par["resources"]), return the number of solutions that differ more
+    than rel_tol. The solutions with assigned crews (see case_solutions) are compared with the stored objective
+    value plus their crew costs
+    """
+    num_diff = 0
+    print("%-40s %12s %12s %10s" % ("solution", "obj_val", "recomputed", "diff"))
+    for sol_name, objs, sol, res in case_solutions(cases):
+        obj = Evaluator(objs["tr"], objs["ma"], res).evaluate(sol)[0]
+        obj_val = sol.obj_val()
+        if res is not None and "resources" not in sol.opt_par:  # (crews assigned by case_solutions)
+            obj_val += crew_costs(sol.crew_sol, res)
+        diff = obj - obj_val
+        ok = abs(diff) <= rel_tol * max(1.0, abs(obj_val))
+        num_diff += 0 if ok else 1
+        print("%-40s %12.4f %12.4f %10.6f%s" % (sol_name, obj_val, obj, diff, "" if ok else " <--"))
+    return num_diff
+
+
+if __name__ == "__main__":
+    register([Network, Traffic, Maintenance, Resources] + solution.types)
+    sys.exit(1 if check(sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(__file__), "..", "cases"))
+             else 0)
@@ -0,0 +1,173 @@
+#!/usr/bin/env python
+"""
+Feasibility checks of solutions: link capacities, maintenance work volumes and crew work/rest limits,
+evaluated with numpy arrays. Usage: feasibility.py [<cases directory>]
+which checks all solutions in the directory
+"""
+import os
+import sys
+from collections import namedtuple
+import numpy as np
+from network import Network
+from traffic import Traffic
+from maintenance import Maintenance
+from resources import Resources
+from train_sets import TrainSets
+import solution
+from evaluator import dense_rows, case_solutions
+from persist import register
+
+__author__ = 'tomas.liden@liu.se'
+
+# A violated constraint, located by link, period and train or crew (None where not applicable)
+Violation = namedtuple("Violation", ["kind", "link", "period", "train", "crew", "value", "limit"])
+
+
+class FeasibilityChecker(object):
+    """
+    Index arrays over the (train, link) pairs of the TrainSets, grouped per link and direction, and the
+    capacity limits per link, set up once per problem instance. The checks work on the dense
+    pairs x periods occupancy (TrainSolution.u) and links x periods work (MaintSolution.y) matrices.
+    """
+
+    def __init__(self, network, traffic, maintenance, train_sets, resources=None, tol=1e-6):
+        nw = network
+        ma = maintenance
+        self.tol = tol
+        self.num_periods = len(traffic.periods)
+        self.period_lengths = np.array(traffic.period_lengths, dtype=float)
+        self.links = sorted(l for l in nw.links if l in nw.capacity)  # links without capacity are not limited
+        link_index = {l: i for i, l in enumerate(self.links)}
+        # (train, link) pairs sorted per link and direction - group g = 2 * link index + direction
+        pairs = sorted((2 * link_index[l] + d, s, l) for l, dirs in train_sets.dirs_over.items()
+                       if l in link_index for s, d in dirs.items())
+        self.pairs = [(s, l) for g, s, l in pairs]
+        groups = np.array([g for g, s, l in pairs], dtype=int)
+        self.groups, self.group_starts = np.unique(groups, return_index=True)
+        self.pair_groups = groups
+        # normal and reduced capacity per link, per direction and in total
+        self.capacity = np.array([nw.capacity[l] for l in self.links], dtype=float).reshape(-1, 2)
+        self.red_cap = np.array([ma.red_cap.get(l, (0, 0)) for l in self.links], dtype=float).reshape(-1, 2)
+        self.work_links = sorted(ma.work_volume)
+        self.work_volume = np.array([ma.work_volume[l] for l in self.work_links], dtype=float)
+        self.work_rows = [link_index.get(l) for l in self.work_links]
+        self.resources = resources
+
+    def occupancy(self, ts):
+        return dense_rows(ts.u, self.pairs, self.num_periods)
+
+    def work(self, ms):
+        return dense_rows(ms.y, self.work_links, self.num_periods)
+
+    def capacity_violations(self, u, y):
+        """
+        Links, periods and trains where the number of trains exceeds the capacity (the reduced capacity
+        when there is maintenance work), per direction and in total
+        """
+        occ = np.zeros((2 * len(self.links), self.num_periods))
+        if len(self.pairs):
+            occ[self.groups] = np.add.reduceat(u, self.group_starts, axis=0)
+        occ = occ.reshape(len(self.links), 2, self.num_periods)
+        maint = np.zeros((len(self.links), self.num_periods), dtype=bool)
+        rows = [i for i, r in enumerate(self.work_rows) if r is not None]
+        maint[[self.work_rows[i] for i in rows]] = y[rows] > 0.5
+        limits = np.where(maint[:, None, :], self.red_cap[:, :, None], self.capacity[:, :, None])
+        violations = []
+        for d in (0, 1):
+            for i, t in zip(*np.nonzero(occ[:, d] > limits[:, 0] + self.tol)):
+                violations += self.__located("capacity", i, t, [2 * i + d], occ[i, d, t], limits[i, 0, t], u)
+        total = occ.sum(axis=1)
+        for i, t in zip(*np.nonzero(total > limits[:, 1] + self.tol)):
+            violations += self.__located("total capacity", i, t, [2 * i, 2 * i + 1], total[i, t], limits[i, 1, t], u)
+        return violations
+
+    def __located(self, kind, i, t, groups, value, limit, u):
+        # one violation per train on the link (in the groups) in period t
+        on_link = np.nonzero(np.in1d(self.pair_groups, groups) & (u[:, t] > 0.5))[0]
+        return [Violation(kind, self.links[i], int(t), self.pairs[p][0], None, float(value), float(limit))
+                for p in on_link] or [Violation(kind, self.links[i], int(t), None, None, float(value), float(limit))]
+
+    def work_violations(self, y):
+        """
+        Links where the maintenance work (over all periods) is less than the required work volume
+        """
+        done = y.dot(self.period_lengths)
+        return [Violation("work volume", self.work_links[i], None, None, None, float(done[i]),
+                          float(self.work_volume[i]))
+                for i in np.nonzero(done < self.work_volume - self.tol)[0]]
+
+    def crew_violations(self, cs):
+        """
+        Crews working longer than max_work or resting less than min_rest (in time units),
+        with the first period of the work or rest
+        """
+        res = self.resources
+        if res is None or cs is None:
+            return []
+        keys = [(l, k) for l in sorted(res.crews) for k in res.crews[l]]
+        d = dense_rows(cs.d, keys, self.num_periods)
+        violations = []
+        for k in res.all_crew:
+            rows = [i for i, key in enumerate(keys) if key[1] == k]
+            working = (d[rows] > 0.5).any(axis=0) if rows else np.zeros(self.num_periods, dtype=bool)
+            for start, length, work in self.__runs(working, res.cyclic):
+                if work and length > res.max_work + self.tol:
+                    violations.append(Violation("max work", None, start, None, k, length, res.max_work))
+                elif not work and length < res.min_rest - self.tol:
+                    violations.append(Violation("min rest", None, start, None, k, length, res.min_rest))
+        return violations
+
+    def __runs(self, working, cyclic):
+        """
+        The runs of working and resting periods as (first period, length in time units, working),
+        without the rest before the first and after the last work unless cyclic
+        """
+        n = len(working)
+        if not working.any():
+            return []
+        changes = np.nonzero(working != np.roll(working, 1))[0]
+        if len(changes) == 0:
+            return [(0, self.period_lengths.sum(), True)]
+        if not cyclic and changes[0] != 0:
+            changes = np.concatenate(([0], changes))
+        cum = np.concatenate(([0.0], np.cumsum(self.period_lengths)))
+        runs = []
+        for j, start in enumerate(changes):
+            end = changes[j + 1] if j + 1 < len(changes) else (changes[0] + n if cyclic else n)
+            length = cum[min(end, n)] - cum[start] + (cum[end - n] if end > n else 0.0)
+            runs.append((int(start), float(length), bool(working[start])))
+        if not cyclic:
+            runs = [r for j, r in enumerate(runs) if r[2] or 0 < j < len(runs) - 1]
+        return runs
+
+    def violations(self, sol):
+        """
+        All violations of the solution sol
+        """
+        u = self.occupancy(sol.train_sol)
+        y = self.work(sol.maint_sol)
+        return self.capacity_violations(u, y) + self.work_violations(y) + self.crew_violations(sol.crew_sol)
+
+
+def check(cases):
+    """
+    Check all solutions in cases (the crew limits with the resources named by opt_par["resources"], and with the
+    crews assigned by evaluator.case_solutions), return the number of solutions with violations
+    """
+    num_infeasible = 0
+    print("%-40s %10s" % ("solution", "violations"))
+    for sol_name, objs, sol, res in case_solutions(cases, ("nw", "tr", "ma")):
+        train_win = sol.opt_par["train_win"] if "train_win" in sol.opt_par else objs["tr"].period_starts[-1]
+        ts = TrainSets.setup(objs["nw"], objs["tr"], train_win)
+        violations = FeasibilityChecker(objs["nw"], objs["tr"], objs["ma"], ts, res).violations(sol)
+        num_infeasible += 1 if violations else 0
+        print("%-40s %10d" % (sol_name, len(violations)))
+        for v in violations:
+            print("  %s" % str(v))
+    return num_infeasible
+
+
+if __name__ == "__main__":
+    register([Network, Traffic, Maintenance, Resources] + solution.types)
+    sys.exit(1 if check(sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(__file__), "..", "cases"))
+             else 0)
@@ -0,0 +1,197 @@
+"""
+Incremental evaluation of solution changes (moves) for local search: the objective and the capacity
+usage are updated for the affected trains, links and periods only, and moves can be undone
+"""
+
+__author__ = 'tomas.liden@liu.se'
+
+
+class IncrementalEvaluator(object):
+    """
+    The state of a solution (train routes and link times, maintenance work and crew assignments) together
+    with its objective components and the capacity usage per link, direction and period.
+    The objective is the same as in evaluator.py.
+    Moves:
+    - shift_train(s, r, dep): run train s on route r departing at dep, shifting its current link times if
+      the route is unchanged, otherwise using the min link and node times
+    - toggle_work(l, t): switch the maintenance work y[l][t] on/off (changing the capacity of link l in t)
+    - reassign_crew(l, t, k): let crew k (None for no crew) do the work on link l in period t (needs the resources)
+    Each move returns the change of the objective. undo() reverts the last move.
+    """
+
+    def __init__(self, network, traffic, maintenance, train_sets, sol, resources=None, cyclic=False):
+        self.nw = network
+        self.tr = traffic
+        self.ma = maintenance
+        self.train_sets = train_sets
+        self.res = resources
+        self.cyclic = cyclic
+        ts = sol.train_sol
+        ms = sol.maint_sol
+        # train state: route, departure, arrival and (link, entry, exit) per link of the route
+        self.route = {}
+        self.dep = dict(ts.eO)
+        self.arr = dict(ts.eD)
+        self.link_times = {}
+        for (s, r), z in ts.z.items():
+            if z > 0.5:
+                self.route[s] = r
+                self.link_times[s] = [(l, ts.ey[s, l], ts.ex[s, l]) for l in self.nw.route_links[r]]
+        self.y = {l: [1 if v > 0.5 else 0 for v in ms.y[l]] for l in ms.y}
+        # the moves do not change the windows, so the setup cost is kept as in the solution
+        self.setup_cost = sum(self.ma.v_cost[l, o, t] * v for (l, o), vs in ms.v.items() for t, v in enumerate(vs))
+        self.crew = {}  # crew per (l, t) with work
+        cs = sol.crew_sol
+        if cs is not None and resources is not None:  # (without the resources there are no crew costs, as in Evaluator)
+            for (l, k), d in cs.d.items():
+                for t, v in enumerate(d):
+                    if v > 0.5:
+                        self.crew[l, t] = k
+        self.undo_stack = []
+        self.recompute()
+
+    def recompute(self):
+        """
+        Set up the objective components and the capacity usage from scratch
+        """
+        tr = self.tr
+        self.components = {
+            "route": sum(tr.r_cost[s, r] for s, r in self.route.items()),
+            "duration": sum(tr.t_cost[s] * (self.arr[s] - self.dep[s]) for s in self.dep),
+            "deviation": sum(tr.d_cost[s] * abs(self.dep[s] - tr.pref_dep[s]) for s in self.dep),
+            "work": sum(self.ma.y_cost[l, t] for l, y in self.y.items() for t, v in enumerate(y) if v),
+            "setup": self.setup_cost
+        }
+        self.occ = {}       # number of trains per (l, direction, t)
+        self.excess = 0     # total number of trains over the capacity (per direction and in total)
+        for s in self.link_times:
+            self.__occupy(s, 1)
+        self.crew_work = {}  # number of links per (k, t)
+        self.crew_links = {}  # number of (link, period) assignments per k
+        self.components.update({"crew": 0.0, "crew_work": 0.0, "crew_link": 0.0})
+        self.objective = 0.0
+        for (l, t), k in list(self.crew.items()):
+            del self.crew[l, t]
+            self.__assign(l, t, k)
+        self.objective = sum(self.components.values())
+        return self.objective
+
+    def __limits(self, l, t):
+        if l in self.y and self.y[l][t]:
+            return self.ma.red_cap.get(l, (0, 0))  # no passage during work without a reduced capacity
+        return self.nw.capacity[l]
+
+    def __excess(self, l, t):
+        if l not in self.nw.capacity:
+            return 0
+        lim = self.__limits(l, t)
+        o0 = self.occ.get((l, 0, t), 0)
+        o1 = self.occ.get((l, 1, t), 0)
+        return max(0, o0 - lim[0]) + max(0, o1 - lim[0]) + max(0, o0 + o1 - lim[1])
+
+    def __occupy(self, s, n):
+        # add (n = 1) or remove (n = -1) the occupation of train s
+        dirs_over = self.train_sets.dirs_over
+        for l, entry, exit in self.link_times.get(s, ()):
+            d = dirs_over[l][s]
+            for t in self.tr.periods_overlapping(entry, exit, self.cyclic):
+                before = self.__excess(l, t)
+                self.occ[l, d, t] = self.occ.get((l, d, t), 0) + n
+                self.excess += self.__excess(l, t) - before
+
+    def __change(self, component, delta):
+        self.components[component] += delta
+        self.objective += delta
+        return delta
+
+    def shift_train(self, s, r, dep):
+        old = (self.route.get(s), self.dep[s], self.arr[s], self.link_times.get(s))
+        self.undo_stack.append((self.__restore_train, (s,) + old))
+        return self.__set_train(s, r, dep, self.__times(s, r, dep))
+
+    def __times(self, s, r, dep):
+        if r == self.route.get(s):
+            shift = dep - self.dep[s]
+            return self.arr[s] + shift, [(l, a + shift, b + shift) for l, a, b in self.link_times[s]]
+        nodes = self.nw.route_nodes[r]
+        times = []
+        for i, l in enumerate(self.nw.route_links[r]):
+            entry = dep + (self.tr.min_dur(s, r, nodes, i) if i else 0)
+            times.append((l, entry, entry + self.tr.min_link_time[s, r][i]))
+        return (times[-1][2] if times else dep), times
+
+    def __set_train(self, s, r, dep, times):
+        tr = self.tr
+        arr, link_times = times
+        delta = 0.0
+        if r != self.route.get(s):
+            delta += self.__change("route", (tr.r_cost[s, r] if r is not None else 0) -
+                                   (tr.r_cost[s, self.route[s]] if s in self.route else 0))
+            if r is None:  # (back to cancelled, when undoing)
+                del self.route[s]
+            else:
+                self.route[s] = r
+        delta += self.__change("duration", tr.t_cost[s] * (arr - dep - self.arr[s] + self.dep[s]))
+        delta += self.__change("deviation", tr.d_cost[s] * (abs(dep - tr.pref_dep[s]) - abs(self.dep[s] -
+                                                                                            tr.pref_dep[s])))
+        self.__occupy(s, -1)
+        self.dep[s], self.arr[s] = dep, arr
+        if link_times is None:  # a cancelled train occupies no links
+            self.link_times.pop(s, None)
+        else:
+            self.link_times[s] = link_times
+        self.__occupy(s, 1)
+        return delta
+
+    def __restore_train(self, s, r, dep, arr, link_times):
+        self.__set_train(s, r, dep, (arr, link_times))
+
+    def toggle_work(self, l, t):
+        self.undo_stack.append((self.__toggle, (l, t)))
+        return self.__toggle(l, t)
+
+    def __toggle(self, l, t):
+        before = self.__excess(l, t)
+        self.y[l][t] = 1 - self.y[l][t]
+        self.excess += self.__excess(l, t) - before
+        return self.__change("work", self.ma.y_cost[l, t] if self.y[l][t] else -self.ma.y_cost[l, t])
+
+    def reassign_crew(self, l, t, k):
+        if self.res is None:
+            raise ValueError("Crews can only be reassigned when the resources are given")
+        self.undo_stack.append((self.__assign, (l, t, self.crew.get((l, t)))))
+        return self.__assign(l, t, k)
+
+    def __assign(self, l, t, k):
+        res = self.res
+        delta = 0.0
+        for crew, n in [(self.crew.pop((l, t), None), -1), (k, 1)]:
+            if crew is None:
+                continue
+            work = self.crew_work.get((crew, t), 0)
+            links = self.crew_links.get(crew, 0)
+            self.crew_work[crew, t] = work + n
+            self.crew_links[crew] = links + n
+            delta += self.__change("crew_link", n * res.link_cost)
+            if (work == 0) != (work + n == 0):
+                delta += self.__change("crew_work", n * res.work_cost)
+            if (links == 0) != (links + n == 0):
+                delta += self.__change("crew", n * res.crew_cost)
+        if k is not None:
+            self.crew[l, t] = k
+        return delta
+
+    def commit(self):
+        """
+        Keep all moves made so far (they can not be undone after this)
+        """
+        self.undo_stack = []
+
+    def undo(self):
+        """
+        Revert the last move, returning the change of the objective
+        """
+        before = self.objective
+        func, args = self.undo_stack.pop()
+        func(*args)
+        return self.objective - before
@@ -2,10 +2,59 @@
 Network maintenance data and accompanying methods
 """
 from numbers import Number
-from persist import Serializable, Multidict
+from persist import Serializable, Field, MULTIDICT
+try:
+    from collections.abc import Mapping
+except ImportError:
+    from collections import Mapping
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 __author__ = 'tomas.liden@liu.se'
 
+use_arrays = np is not None  # store y_cost and v_cost as PeriodCosts matrices when loading
+
+
+class PeriodCosts(Mapping):
+    """
+    Costs per key and period stored as a dense numpy matrix, with one row per key, e.g. the work cost
+    per link (key = l) or the setup cost per link and option (key = (l, o)).
+    Works as the read-only dict keyed by (l, t) or (l, o, t) respectively, i.e. the key with the period added.
+    """
+
+    def __init__(self, rows, matrix, key_len):
+        self.rows = rows            # row index per key
+        self.matrix = matrix        # keys x periods
+        self.key_len = key_len      # number of key elements (before the period)
+
+    def scale(self, fac):
+        return PeriodCosts(self.rows, fac * self.matrix, self.key_len)
+
+    def row(self, key):
+        return self.matrix[self.rows[key]]
+
+    def __getitem__(self, k):
+        if not isinstance(k, tuple) or len(k) != self.key_len + 1:
+            raise KeyError(k)
+        key, t = (k[0] if self.key_len == 1 else k[:-1]), k[-1]
+        if key not in self.rows or not 0 <= t < self.matrix.shape[1]:
+            raise KeyError(k)
+        return self.matrix[self.rows[key], t].item()
+
+    def __iter__(self):
+        periods = range(self.matrix.shape[1])
+        for key in self.rows:
+            for t in periods:
+                yield (key, t) if self.key_len == 1 else key + (t,)
+
+    def __len__(self):
+        return self.matrix.size
+
+    def __repr__(self):
+        return "%s(%s)" % (self.__class__.__name__, dict(self.items()))
+
 
 class Maintenance(Serializable):
     """
@@ -13,11 +62,22 @@ class Maintenance(Serializable):
     together with work and setup costs per link and time.
     Shift counts and lengths are given for each window option.
     """
+    # the costs are stored packed, see packed_y_cost and packed_v_cost
+    fields = (
+        Field("work_volume", MULTIDICT, key=2),
+        Field("shift_counts"),
+        Field("shift_lengths"),
+        Field("link_options", MULTIDICT, key=2, element=tuple),
+        Field("red_cap", MULTIDICT, key=2, element=tuple),
+        Field("y_cost", MULTIDICT, key=2, attr="packed_y_cost"),
+        Field("v_cost", MULTIDICT, key=(2, 1), attr="packed_v_cost"),
+        Field("num_periods")
+    )
 
-    def __init__(self, volume, shift_counts, shift_lengths, link_options, red_cap, y_cost, v_cost, num_periods):
+    def __init__(self, work_volume, shift_counts, shift_lengths, link_options, red_cap, y_cost, v_cost, num_periods):
         Serializable.__init__(self)
         # @formatter:off
-        self.work_volume = volume           # req. work vol. per link   - V_l
+        self.work_volume = work_volume      # req. work vol. per link   - V_l
         self.shift_counts = shift_counts    # number of shifts per opt  - chi_o
         self.shift_lengths = shift_lengths  # shift length per opt      - nu_o
         self.link_options = link_options    # window options per link   - W_l
@@ -30,14 +90,47 @@ class Maintenance(Serializable):
     def scale(self, y_fac, v_fac):
         return Maintenance(self.work_volume, self.shift_counts, self.shift_lengths,
                            self.link_options, self.red_cap,
-                           {k: y_fac*v for k, v in self.y_cost.items()},
-                           {k: v_fac*v for k, v in self.v_cost.items()},
+                           self.__scale(self.y_cost, y_fac),
+                           self.__scale(self.v_cost, v_fac),
                            self.__num_periods)
 
+    @staticmethod
+    def __scale(costs, fac):
+        if isinstance(costs, PeriodCosts):
+            return costs.scale(fac)
+        return {k: fac*v for k, v in costs.items()}
+
     @staticmethod
     def __pack(lst):
         return lst[0] if all(x == lst[0] for x in lst) else lst
 
+    def __packed(self, costs, key, keys):
+        if isinstance(costs, PeriodCosts):
+            row = costs.row(key)
+            return row[0].item() if (row == row[0]).all() else row.tolist()
+        return self.__pack([costs[k] for k in keys])
+
+    @property
+    def num_periods(self):
+        return self.__num_periods
+
+    @property
+    def packed_y_cost(self):
+        """
+        The work costs per link, as one value when it is the same in all periods
+        """
+        periods = range(self.__num_periods)
+        return {l: self.__packed(self.y_cost, l, [(l, t) for t in periods]) for l in self.work_volume}
+
+    @property
+    def packed_v_cost(self):
+        """
+        The setup costs per link and option, as one value when it is the same in all periods
+        """
+        periods = range(self.__num_periods)
+        return {(l, o): self.__packed(self.v_cost, (l, o), [(l, o, t) for t in periods])
+                for l in self.work_volume for o in self.link_options[l]}
+
     def train_passage_possible(self, l):
         return l in self.red_cap and self.red_cap[l][0] > 0
 
@@ -59,34 +152,43 @@ class Maintenance(Serializable):
             "Setup cost   : %s" % str(self.v_cost)
         ])
 
-    def to_json(self):
-        packed_y_cost = {}
-        packed_v_cost = {}
-        periods = range(self.__num_periods)
-        for l in self.work_volume:
-            packed_y_cost[l] = self.__pack([self.y_cost[l, t] for t in periods])
-            for o in self.link_options[l]:
-                packed_v_cost[l, o] = self.__pack([self.v_cost[l, o, t] for t in periods])
-        return self.rep({
-            "work_volume": Multidict(self.work_volume),
-            "shift_counts": self.shift_counts,
-            "shift_lengths": self.shift_lengths,
-            "link_options": Multidict(self.link_options),
-            "red_cap": Multidict(self.red_cap),
-            "y_cost": Multidict(packed_y_cost),
-            "v_cost": Multidict(packed_v_cost),
-            "num_periods": self.__num_periods
-        })
+    @classmethod
+    def from_fields(cls, work_volume, link_options, y_cost, v_cost, num_periods, **values):
+        # expanding the packed costs
+        packed_y_cost, packed_v_cost = y_cost, v_cost
+        y_cost = v_cost = None
+        if use_arrays:
+            y_cost = Maintenance.__matrix(packed_y_cost, list(work_volume), num_periods, 1)
+            v_cost = Maintenance.__matrix(packed_v_cost, [(l, o) for l in work_volume for o in link_options[l]],
+                                          num_periods, 2)
+        if y_cost is None or v_cost is None:
+            y_cost, v_cost = Maintenance.__expand(packed_y_cost, packed_v_cost, work_volume, link_options,
+                                                  range(num_periods))
+        return cls(work_volume=work_volume, link_options=link_options, y_cost=y_cost, v_cost=v_cost,
+                   num_periods=num_periods, **values)
+
+    @staticmethod
+    def __matrix(packed, keys, num_periods, key_len):
+        """
+        The PeriodCosts from the packed format, None if the costs are not all floats or all integers
+        (a float matrix would turn the integers into floats, and the dumps would change)
+        """
+        matrix = np.array([[packed[k]] * num_periods if isinstance(packed[k], Number) else packed[k] for k in keys])
+        if matrix.dtype.kind == 'f':
+            types = set()
+            for k in keys:
+                types.update(map(type, packed[k]) if isinstance(packed[k], list) else [type(packed[k])])
+            if types != {float}:
+                return None
+        elif matrix.dtype.kind not in 'iu':
+            return None
+        return PeriodCosts({k: i for i, k in enumerate(keys)}, matrix.reshape(len(keys), num_periods), key_len)
 
     @staticmethod
-    def from_json(chunk):
-        num_periods = chunk["num_periods"]
-        periods = range(num_periods)
-        work_volume = chunk["work_volume"].data
-        link_options = {k: tuple(v) for k, v in chunk["link_options"].data.items()}
-        packed_y_cost = chunk["y_cost"].data
-        packed_v_cost = chunk["v_cost"].data
-        # expanding y_cost and v_cost from the packed format
+    def __expand(packed_y_cost, packed_v_cost, work_volume, link_options, periods):
+        """
+        Expanding y_cost and v_cost from the packed format into dicts
+        """
         y_cost = {}
         v_cost = {}
         for l in work_volume:
@@ -97,13 +199,4 @@ class Maintenance(Serializable):
                 vc = packed_v_cost[l, o]
                 for t in periods:
                     v_cost[l, o, t] = vc if isinstance(vc, Number) else vc[t]
-        return Maintenance(
-            work_volume,
-            chunk["shift_counts"],
-            chunk["shift_lengths"],
-            link_options,
-            {k: tuple(v) for k, v in chunk["red_cap"].data.items()},
-            y_cost,
-            v_cost,
-            num_periods
-        )
+        return y_cost, v_cost
@@ -1,7 +1,7 @@
 """
 The rail network data and methods for loading, saving etc
 """
-from persist import Serializable, Multidict, tupleify
+from persist import Serializable, Field, TUPLE, DICT, MULTIDICT, tuples
 from random import uniform
 from math import sqrt, radians, sin, cos
 
@@ -46,7 +46,7 @@ class Nodes(dict):
         self[name] = point
 
     def overlap(self, point):
-        for n in self.itervalues():
+        for n in self.values():
             if dist(n, point) < 0.01:
                 return True
         return False
@@ -62,6 +62,15 @@ class Network(Serializable):
     - route_nodes: nodes in route r (N_r)
     - route_dirs: travel dir. per route (d_l for l in L_r)
     """
+    fields = (
+        Field("nodes"),
+        Field("links", TUPLE, element=tuple),
+        Field("routes"),
+        Field("capacity", MULTIDICT, key=2, element=tuple),
+        Field("route_links", DICT, element=tuples),
+        Field("route_nodes", DICT, element=tuple),
+        Field("route_dirs", DICT, element=tuple)
+    )
 
     def __init__(self, nodes, links, routes, capacity, route_links, route_nodes, route_dirs):
         Serializable.__init__(self)
@@ -101,26 +110,3 @@ class Network(Serializable):
             "Route links: %s" % self.route_links,
             "Route dirs : %s" % self.route_dirs
         ])
-
-    def to_json(self):
-        return self.rep({
-            "nodes": self.nodes,
-            "links": self.links,
-            "routes": self.routes,
-            "capacity": Multidict(self.capacity),
-            "route_links": self.route_links,  # dict will be stored as list
-            "route_nodes": self.route_nodes,  # -"-
-            "route_dirs": self.route_dirs  # -"-
-        })
-
-    @staticmethod
-    def from_json(chunk):
-        return Network(
-            chunk["nodes"],
-            tupleify(chunk["links"]),
-            chunk["routes"],
-            {k: tuple(v) for k, v in chunk["capacity"].data.items()},
-            {k: tupleify(v) for k, v in chunk["route_links"].items()},
-            {k: tuple(v) for k, v in chunk["route_nodes"].items()},
-            {k: tuple(v) for k, v in chunk["route_dirs"].items()}
-        )
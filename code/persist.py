@@ -2,17 +2,56 @@
 """
 Methods and classes for handling persistence of data objects
 """
+from __future__ import print_function
+import array
+import collections
+import glob
+import hashlib
+import heapq
 import inspect
 import json
+import mmap
+import multiprocessing
+import os
+import re
+import struct
+import sys
+import tempfile
+from bisect import bisect_left, bisect_right
+from json.decoder import scanstring
 from math import ceil, log10
+from operator import attrgetter
+try:
+    from collections.abc import Sequence
+except ImportError:
+    from collections import Sequence
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+try:
+    import numpy as np
+except ImportError:
+    np = None  # only needed for RunList.from_array/to_array (and the binary_load arrays with Python 2)
+try:
+    import orjson
+except ImportError:
+    orjson = None  # the json module is used instead
 
 __author__ = 'tomas.liden@liu.se'
 
+_PY2 = sys.version_info[0] == 2  # the strings from JSON are then unicode and converted to byte strings
 
-class Serializable:
+
+class Serializable(object):
     """
-    Stub class for non-standard objects to be serialized with JSON
+    Stub class for non-standard objects to be serialized with JSON.
+    A subclass either declares its fields (see Field), from which the to_json and from_json code is generated,
+    or implements both methods itself
     """
+    __slots__ = ()  # allows subclasses with __slots__ (subclasses without them get a __dict__ as usual)
+    fields = None  # the Field declarations, in the order they are written
+
     def __init__(self):
         pass
 
@@ -21,7 +60,9 @@ class Serializable:
         Return a representation that is serializable by JSON, using the following code stub
         return self.rep({k1: v1, k2: v2})
         """
-        raise NotImplementedError
+        if self.fields is None:
+            raise NotImplementedError
+        return _codec(self.__class__).encode(self)
 
     def rep(self, r):
         """
@@ -34,12 +75,21 @@ class Serializable:
         r.update({"__class__": self.__class__.__name__})
         return r
 
-    @staticmethod
-    def from_json(chunk):
+    @classmethod
+    def from_json(cls, chunk):
         """
         Return a class object from the chunk coming from JSON
         """
-        raise NotImplementedError
+        if cls.fields is None:
+            raise NotImplementedError
+        return _codec(cls).decode(chunk)
+
+    @classmethod
+    def from_fields(cls, **values):
+        """
+        Create the object from the decoded field values (by field name), as the generated from_json does
+        """
+        return cls(**values)
 
 
 class Multidict(Serializable):
@@ -52,32 +102,89 @@ class Multidict(Serializable):
         Serializable.__init__(self)
         self.data = md
 
+    def __getattr__(self, name):
+        # a decoded Multidict keeps the raw items until data is needed (or typed is called)
+        if name != "data" or "_Multidict__items" not in self.__dict__:
+            raise AttributeError(name)
+        self.data = dict([(tupleify(k), v) for k, v in self.__dict__.pop("_Multidict__items")])
+        return self.data
+
     def __repr__(self):
         return "%s(%s)" % (self.__class__.__name__, self.data)
 
     def to_json(self):
-        o = self.rep({"items": self.data.items()})
+        o = self.rep({"items": list(self.data.items())})
         return o
 
+    def typed(self, key, value=None):
+        """
+        Convert the raw items knowing their shape, instead of the generic (recursive) tupleify
+        :param key: key arity - 1 for plain keys, n for n-tuples, or a tuple of arities for nested keys,
+        e.g. (2, 1) for ((n1, n2), o)
+        :param value: type applied to each value (e.g. tuple), None to keep them as they are
+        :return: self
+        """
+        items = self.__dict__.pop("_Multidict__items", None)
+        if items is not None:
+            self.data = _typed_dict(items, _key_type(key), value)
+        return self
+
     @staticmethod
     def from_json(chunk):
-        md = dict([(tupleify(k), v) for k, v in chunk["items"]])
-        return Multidict(md)
+        md = Multidict.__new__(Multidict)
+        md.__items = chunk["items"]
+        return md
 
 
-class SparseList(Serializable):
+def _key_type(arity):
+    """
+    The key conversion for the given arity (see Multidict.typed), None if the keys are kept as they are
+    """
+    if not isinstance(arity, tuple):
+        return None if arity == 1 else tuple
+    nested = [(i, _key_type(a)) for i, a in enumerate(arity) if a != 1]
+
+    def key(k):
+        k = list(k)
+        for i, t in nested:
+            k[i] = t(k[i])
+        return tuple(k)
+    return key
+
+
+def _typed_dict(items, key, value):
+    if key is tuple and value is None:
+        return {tuple(k): v for k, v in items}
+    if key is tuple and value is tuple:
+        return {tuple(k): tuple(v) for k, v in items}
+    if key is None and value is None:
+        return dict(items)
+    return {k if key is None else key(k): v if value is None else value(v) for k, v in items}
+
+
+class SparseList(Serializable, Sequence):
     """
     Class for storing sparse lists in a more compact form, using a list of (index, value) tuples
+    for the entries that differ from the default value.
+    It is a read-only sequence, with O(log n) indexing by bisection over the stored indices.
     """
+    __slots__ = ("default", "size", "__index", "__data")
 
     def __init__(self, default, values, size):
         Serializable.__init__(self)
         self.default = default
-        self.values = values
         self.size = size
+        self.__index = tuple(i for i, v in values)
+        self.__data = tuple(v for i, v in values)
+
+    @property
+    def values(self):
+        return list(zip(self.__index, self.__data))
 
     @staticmethod
     def floats(ls, default_val=0.0, eps=1E-10):
+        if isinstance(ls, SparseList) and ls.default == default_val:
+            return SparseList(default_val, [(i, v) for i, v in ls.values if abs(v - default_val) > eps], ls.size)
         va = []
         for i, v in enumerate(ls):
             if abs(v - default_val) > eps:
@@ -86,10 +193,45 @@ class SparseList(Serializable):
 
     def as_list(self):
         l = [self.default] * self.size
-        for (i, v) in self.values:
+        for i, v in zip(self.__index, self.__data):
             l[i] = v
         return l
 
+    def nonzero(self):
+        """
+        The indices of all non-zero entries
+        """
+        if self.default:
+            return [i for i, v in enumerate(self.as_list()) if v]
+        return [i for i, v in zip(self.__index, self.__data) if v]
+
+    def sum(self):
+        return self.default * (self.size - len(self.__index)) + sum(self.__data)
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return self.as_list()[i]
+        if i < 0:
+            i += self.size
+        if not 0 <= i < self.size:
+            raise IndexError("SparseList index out of range")
+        k = bisect_left(self.__index, i)
+        return self.__data[k] if k < len(self.__index) and self.__index[k] == i else self.default
+
+    def __iter__(self):
+        return iter(self.as_list())
+
+    def __eq__(self, other):
+        return isinstance(other, (SparseList, RunList, MappedArray, list, tuple)) and self.as_list() == list(other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
     def __repr__(self):
         return "%s(%s, %s, %s)" % (self.__class__.__name__, self.default, self.values, self.size)
 
@@ -104,6 +246,208 @@ class SparseList(Serializable):
         return SparseList(chunk["def"], chunk["va"], chunk["n"])
 
 
+class RunList(Serializable, Sequence):
+    """
+    Class for storing 0/1 lists (such as work periods) as the runs of ones, given by (start, end) tuples
+    with the end excluded. It is a read-only sequence of floats, with O(log runs) indexing by bisection.
+    The set operations take O(runs) time and return new RunLists.
+    """
+    __slots__ = ("size", "__starts", "__ends")
+
+    def __init__(self, runs, size):
+        Serializable.__init__(self)
+        self.size = size
+        self.__starts = tuple(a for a, b in runs)
+        self.__ends = tuple(b for a, b in runs)
+
+    @property
+    def runs(self):
+        return list(zip(self.__starts, self.__ends))
+
+    @staticmethod
+    def binary(ls):
+        """
+        The list ls as a RunList, None if it has other values than 0 and 1
+        """
+        if isinstance(ls, RunList):
+            return ls
+        if isinstance(ls, SparseList):
+            if ls.default != 0 or any(v != 0 and v != 1 for i, v in ls.values):
+                return None
+            return RunList(RunList.__runs(i for i, v in ls.values if v), ls.size)
+        if any(v != 0 and v != 1 for v in ls):
+            return None
+        return RunList(RunList.__runs(i for i, v in enumerate(ls) if v), len(ls))
+
+    @staticmethod
+    def where(ls, threshold=0.5):
+        """
+        The entries of the list ls above the threshold as a RunList
+        """
+        if isinstance(ls, RunList) and 0 <= threshold < 1:
+            return ls
+        if isinstance(ls, SparseList) and not ls.default > threshold:
+            return RunList(RunList.__runs(i for i, v in ls.values if v > threshold), ls.size)
+        return RunList(RunList.__runs(i for i, v in enumerate(ls) if v > threshold), len(ls))
+
+    @staticmethod
+    def __runs(indices):
+        # the runs of the increasing indices
+        runs = []
+        for i in indices:
+            if runs and runs[-1][1] == i:
+                runs[-1][1] = i + 1
+            else:
+                runs.append([i, i + 1])
+        return runs
+
+    @staticmethod
+    def from_array(a):
+        """
+        The nonzero entries of the (1-dimensional) numpy array a as a RunList
+        """
+        edges = np.diff(np.concatenate(([0], np.asarray(a) != 0, [0])).astype(np.int8))
+        return RunList(list(zip(np.flatnonzero(edges == 1).tolist(), np.flatnonzero(edges == -1).tolist())), len(a))
+
+    def to_array(self, dtype=float):
+        a = np.zeros(self.size, dtype=dtype)
+        for start, end in zip(self.__starts, self.__ends):
+            a[start:end] = 1
+        return a
+
+    def as_list(self):
+        l = [0.0] * self.size
+        for start, end in zip(self.__starts, self.__ends):
+            l[start:end] = [1.0] * (end - start)
+        return l
+
+    def nonzero(self):
+        """
+        The indices of all non-zero entries
+        """
+        return [i for start, end in zip(self.__starts, self.__ends) for i in range(start, end)]
+
+    def sum(self):
+        return float(sum(self.__ends) - sum(self.__starts))
+
+    def overlaps(self, other):
+        """
+        True if the two RunLists have a one in the same position
+        """
+        i = j = 0
+        while i < len(self.__starts) and j < len(other.__starts):
+            if self.__starts[i] < other.__ends[j] and other.__starts[j] < self.__ends[i]:
+                return True
+            if self.__ends[i] < other.__ends[j]:
+                i += 1
+            else:
+                j += 1
+        return False
+
+    def intersection(self, other):
+        runs = []
+        i = j = 0
+        while i < len(self.__starts) and j < len(other.__starts):
+            start = max(self.__starts[i], other.__starts[j])
+            end = min(self.__ends[i], other.__ends[j])
+            if start < end:
+                runs.append((start, end))
+            if self.__ends[i] < other.__ends[j]:
+                i += 1
+            else:
+                j += 1
+        return RunList(runs, max(self.size, other.size))
+
+    def union(self, other):
+        runs = []
+        for start, end in heapq.merge(self.runs, other.runs):
+            if runs and start <= runs[-1][1]:
+                runs[-1][1] = max(runs[-1][1], end)
+            else:
+                runs.append([start, end])
+        return RunList(runs, max(self.size, other.size))
+
+    __and__ = intersection
+    __or__ = union
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return self.as_list()[i]
+        if i < 0:
+            i += self.size
+        if not 0 <= i < self.size:
+            raise IndexError("RunList index out of range")
+        k = bisect_right(self.__starts, i) - 1
+        return 1.0 if k >= 0 and i < self.__ends[k] else 0.0
+
+    def __iter__(self):
+        return iter(self.as_list())
+
+    def __eq__(self, other):
+        if isinstance(other, RunList):
+            return self.size == other.size and self.runs == other.runs
+        return isinstance(other, (SparseList, MappedArray, list, tuple)) and self.as_list() == list(other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return "%s(%s, %s)" % (self.__class__.__name__, self.runs, self.size)
+
+    def to_json(self):
+        return self.rep({"runs": self.runs,
+                         "n": self.size})
+
+    @staticmethod
+    def from_json(chunk):
+        return RunList(chunk["runs"], chunk["n"])
+
+
+class _RawChunk(object):
+    """
+    The JSON text of a value (from a lazy load) waiting to be decoded, as the text of the file and the
+    start and end of the value in it (so that the text is not copied)
+    """
+    def __init__(self, text, start, end):
+        self.text = text
+        self.start = start
+        self.end = end
+
+    def decode(self):
+        return _byte_strings(_loads(self.text[self.start:self.end]))
+
+
+class LazyAttribute(object):
+    """
+    Descriptor for an attribute of a Serializable class that is not decoded by json_load(f, lazy=True).
+    The raw chunk is then kept and decoded on first access.
+    """
+    def __init__(self, name):
+        self.name = name
+        self.attr = "_" + name
+
+    def __get__(self, obj, cls):
+        if obj is None:
+            return self
+        value = getattr(obj, self.attr)
+        if isinstance(value, _RawChunk):
+            value = value.decode()
+            setattr(obj, self.attr, value)
+        return value
+
+    def __set__(self, obj, value):
+        setattr(obj, self.attr, value)
+
+
+def lazy_attributes(cls):
+    return set(a.name for c in inspect.getmro(cls) for a in vars(c).values() if isinstance(a, LazyAttribute))
+
+
 def tupleify(d):
     if isinstance(d, list):
         return tuple(tupleify(e) for e in d)
@@ -111,50 +455,257 @@ def tupleify(d):
         return d
 
 
+def tuples(ls):
+    """
+    The list of lists ls as a tuple of tuples, e.g. for a list of links
+    """
+    return tuple([tuple(e) for e in ls])
+
+
+PLAIN = "plain"  # stored as it is
+TUPLE = "tuple"  # a list, decoded as a tuple
+DICT = "dict"  # a dict with string keys
+MULTIDICT = "multidict"  # a dict with tuple keys, stored as a Multidict
+
+
+class Field(object):
+    """
+    Declaration of a serialized field of a Serializable class:
+    - name: the JSON key, which is also the attribute and the constructor argument
+    - kind: the container kind - PLAIN, TUPLE, DICT or MULTIDICT
+    - key: the key arity of a MULTIDICT, as for Multidict.typed (None for the generic tupleify of the keys)
+    - element: type applied to the elements (dict values) when decoding, e.g. tuple - None to keep them
+    - pack: packing applied to the elements (dict values) when encoding, e.g. as SparseLists - None for none
+    - attr: the attribute (or property) to encode, when it is not the name
+    """
+    __slots__ = ("name", "kind", "key", "element", "pack", "attr")
+
+    def __init__(self, name, kind=PLAIN, key=None, element=None, pack=None, attr=None):
+        self.name = name
+        self.kind = kind
+        self.key = key
+        self.element = element
+        self.pack = pack
+        self.attr = attr or name
+
+    def __repr__(self):
+        return "Field(%r, %r)" % (self.name, self.kind)
+
+    def encoder(self):
+        """
+        The function giving the JSON value of this field of an object
+        """
+        get = attrgetter(self.attr)
+        pack = self.pack
+        if self.kind == MULTIDICT:
+            if pack is None:
+                return lambda obj: Multidict(get(obj))
+            return lambda obj: Multidict({k: pack(v) for k, v in get(obj).items()})
+        if pack is None:
+            return get
+        if self.kind == PLAIN:
+            return lambda obj: pack(get(obj))
+        if self.kind == TUPLE:
+            return lambda obj: [pack(e) for e in get(obj)]
+        return lambda obj: {k: pack(v) for k, v in get(obj).items()}
+
+    def decoder(self):
+        """
+        The function giving the field value from its (decoded) JSON value
+        """
+        element = self.element
+        if self.kind == MULTIDICT:
+            if self.key is not None:
+                key = self.key
+                return lambda md: md.typed(key, element).data
+            if element is None:
+                return lambda md: md.data
+            return lambda md: {k: element(v) for k, v in md.data.items()}
+        if self.kind == TUPLE:
+            if element is None:
+                return tuple
+            return lambda ls: tuple([element(e) for e in ls])
+        if element is None:
+            return None
+        if self.kind == PLAIN:
+            return element
+        return lambda d: {k: element(v) for k, v in d.items()}
+
+
+_Codec = collections.namedtuple("_Codec", "encode decode")
+_codecs = {}  # the generated codec per class with declared fields
+
+
+def _codec(cls):
+    """
+    The generated to_json and from_json functions of cls (registered or not)
+    """
+    codec = _codecs.get(cls)
+    if codec is None:
+        codec = _codecs[cls] = _generate_codec(cls)
+    return codec
+
+
+def _generate_codec(cls):
+    """
+    Generate the encode and decode functions of cls from its field declarations. The functions are compiled
+    with one expression per field, so the fields stored as they are just become an attribute or an item lookup
+    """
+    namespace = {"create": cls.from_fields}
+    encoded = []
+    decoded = []
+    for i, f in enumerate(cls.fields):
+        if f.kind != MULTIDICT and f.pack is None:
+            encoded.append("%r: obj.%s" % (f.name, f.attr))
+        else:
+            namespace["encode_%d" % i] = f.encoder()
+            encoded.append("%r: encode_%d(obj)" % (f.name, i))
+        decoder = f.decoder()
+        if decoder is None:
+            decoded.append("%s=chunk[%r]" % (f.name, f.name))
+        else:
+            namespace["decode_%d" % i] = decoder
+            decoded.append("%s=decode_%d(chunk[%r])" % (f.name, i, f.name))
+    source = "\n".join([
+        "def encode(obj):",
+        "    return obj.rep({%s})" % ", ".join(encoded),
+        "def decode(chunk):",
+        "    return create(%s)" % ", ".join(decoded)
+    ])
+    exec(compile(source, "<%s codec>" % cls.__name__, "exec"), namespace)
+    return _Codec(namespace["encode"], namespace["decode"])
+
+
+def _to_json(o):
+    if isinstance(o, Serializable):
+        return o.to_json()
+    if isinstance(o, MappedArray):
+        return o.tolist()
+    raise TypeError(str(o) + ' is not JSON serializable')
+
+
 class _Encoder(json.JSONEncoder):
     def default(self, o):
-        if isinstance(o, Serializable):
-            return o.to_json()
-        raise TypeError(str(o) + ' is not JSON serializable')
+        return _to_json(o)
+
+
+def _loads(s):
+    """
+    The objects in the JSON text s, decoded by the json module with an object hook (whatever the backend)
+    """
+    return json.loads(s, object_hook=_decoder)
 
 
-def json_dumps(obj):
+class _StdlibBackend(object):
+    """
+    The json module of the standard library
+    """
+    name = "json"
+
+    @staticmethod
+    def raw_loads(s):
+        return json.loads(s)
+
+    @staticmethod
+    def dumps(obj):
+        return json.dumps(obj, cls=_Encoder, separators=(',', ':'))
+
+
+class _OrjsonBackend(object):
+    """
+    The orjson package (Python 3), for the compact dumps and the raw loads only: loading the objects
+    with orjson needs a decoding pass over its document tree, which is slower than the object hook of
+    the json module (see the json_engines benchmark)
+    """
+    name = "orjson"
+
+    @staticmethod
+    def raw_loads(s):
+        return orjson.loads(s)
+
+    @staticmethod
+    def dumps(obj):
+        return orjson.dumps(obj, default=_to_json, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+
+
+json_backends = {_StdlibBackend.name: _StdlibBackend}
+if orjson is not None:
+    json_backends[_OrjsonBackend.name] = _OrjsonBackend
+json_backend = json_backends.get("orjson", _StdlibBackend)  # the fastest available, see set_json_backend
+
+
+def set_json_backend(name):
+    """
+    Select the JSON engine (one of json_backends) for the compact dumps and the raw loads (json_backend.raw_loads,
+    without objects). The objects are always loaded by the json module, and the indented and sorted dumps are
+    always made by it, to keep the files unchanged.
+    """
+    global json_backend
+    json_backend = json_backends[name]
+
+
+def json_dumps(obj, compact=False):
+    """
+    The JSON text of obj, sorted by keys. With compact=True it is written by the selected backend,
+    without whitespace and in the dict order.
+    """
+    if compact:
+        return json_backend.dumps(obj)
     return json.dumps(obj, cls=_Encoder, sort_keys=True)
 
 
-def json_dump(obj, fp):
-    json.dump(obj, fp, cls=_Encoder, sort_keys=True, indent=2)
+def json_dump(obj, fp, compact=False):
+    """
+    Dump obj to fp, indented and sorted by keys, or compact as given by json_dumps(obj, compact=True)
+    (e.g. for solver output)
+    """
+    if compact:
+        fp.write(json_backend.dumps(obj))
+    else:
+        # the item separator of Python 2 (with a trailing space) keeps the files the same in Python 3
+        json.dump(obj, fp, cls=_Encoder, sort_keys=True, indent=2, separators=(', ', ': '))
 
 
 def register(types):
     """
-    Register the serializable classes.
-    Will add Multidict if it's not given in types
+    Register the serializable classes, and generate the encode and decode code of those declaring their fields.
+    Will add Multidict, SparseList and RunList if they are not given in types
     :param types: list of types, e.g. globals().values(), locals().values(), [Multidict, ...]
     """
-    global serializableClasses
+    global serializableClasses, _decoders
     serializableClasses = {c.__name__: c
                            for c in types if inspect.isclass(c) and issubclass(c, Serializable)}
     if "Multidict" not in serializableClasses:
         serializableClasses[Multidict.__name__] = Multidict
     if "SparseList" not in serializableClasses:
         serializableClasses[SparseList.__name__] = SparseList
+    if "RunList" not in serializableClasses:
+        serializableClasses[RunList.__name__] = RunList
+    _decoders = {}
+    for name, c in serializableClasses.items():
+        if c.fields is not None:
+            _codecs[c] = _generate_codec(c)
+        # the generated decoder is called directly, unless the class has its own from_json
+        generated = getattr(c.from_json, "__func__", None) is Serializable.from_json.__func__
+        _decoders[name] = _codecs[c].decode if c.fields is not None and generated else c.from_json
 
 
 serializableClasses = {}
+_decoders = {}  # the from_json function per class name
 
 
 def _decoder(chunk):
     assert len(serializableClasses) > 0, "No serializable classes known - must call register(types) before decoding"
-    chunk = _byteify(chunk)
+    if _PY2:
+        chunk = _byteify(chunk)
     if "__class__" in chunk and chunk["__class__"] in serializableClasses:
-        return serializableClasses[chunk["__class__"]].from_json(chunk)
+        return _decoders[chunk["__class__"]](chunk)
     return chunk
 
 
 def _byteify(d):
     """
-    Transform unicode (from JSON) into normal python byte strings
+    Transform unicode (from JSON) into normal python byte strings - only needed for Python 2
     :param d: raw decoded json object (from json.load/loads)
     :return: recursive byte transformation of d
     """
@@ -168,12 +719,742 @@ def _byteify(d):
         return d
 
 
-def json_loads(s):
-    return json.loads(s, object_hook=_decoder)
+def _native(key):
+    return key.encode('utf-8') if _PY2 else key
 
 
-def json_load(f):
-    return json.load(f, object_hook=_decoder)
+def decode(d):
+    """
+    Decode a raw JSON structure (as given by json.load without object hook) the same way as json_load does
+    """
+    if isinstance(d, dict):
+        chunk = {_native(key): decode(value) for key, value in d.items()}
+        if "__class__" in chunk and chunk["__class__"] in serializableClasses:
+            return _decoders[chunk["__class__"]](chunk)
+        return chunk
+    elif isinstance(d, list):
+        return [decode(element) for element in d]
+    elif _PY2 and isinstance(d, unicode):
+        return d.encode('utf-8')
+    else:
+        return d
+
+
+def _members(s):
+    """
+    The members of the JSON object in s as (key, start, end) of the value texts, None if s is not an object.
+    The values are skipped over by the C scanner with an object hook that drops all objects, so that no
+    document tree is kept
+    """
+    pos = _WHITESPACE.match(s, 0).end()
+    if s[pos:pos + 1] != '{':
+        return None
+    members = []
+    pos = _WHITESPACE.match(s, pos + 1).end()
+    if s[pos:pos + 1] == '}':
+        return members
+    while True:
+        if s[pos:pos + 1] != '"':
+            raise ValueError("Expecting property name at %d" % pos)
+        key, pos = scanstring(s, pos + 1)
+        m = _DELIMITER.match(s, pos)
+        if not m or m.group(1) != ':':
+            raise ValueError("Expecting ':' delimiter at %d" % pos)
+        start = _WHITESPACE.match(s, m.end()).end()
+        try:
+            end = _skip_value(s, start)[1]
+        except StopIteration:
+            raise ValueError("Expecting value at %d" % start)
+        members.append((key, start, end))
+        m = _DELIMITER.match(s, end)
+        if not m or m.group(1) not in ',}':
+            raise ValueError("Expecting ',' delimiter at %d" % end)
+        if m.group(1) == '}':
+            return members
+        pos = _WHITESPACE.match(s, m.end()).end()
+
+
+_skip_value = json.JSONDecoder(object_pairs_hook=lambda pairs: None).scan_once
+
+
+def json_loads(s, lazy=False):
+    """
+    The object in the JSON text s. With lazy=True the lazy attributes of the top object (see LazyAttribute)
+    are only skipped over, keeping their text, and decoded on first access
+    """
+    members = _members(s) if lazy else None
+    if members:
+        text = {key: (start, end) for key, start, end in members}
+        cls = json.loads(s[slice(*text["__class__"])]) if "__class__" in text else None
+        if cls in serializableClasses:
+            lazy = lazy_attributes(serializableClasses[cls])
+            return _decoders[cls]({_native(key): _RawChunk(s, start, end) if key in lazy
+                                   else _byte_strings(_loads(s[start:end])) for key, start, end in members})
+    return _loads(s)
+
+
+def json_load(f, lazy=False):
+    """
+    Load the object in f. With lazy=True the lazy attributes (such as the sub-solutions of a Solution)
+    are decoded on first access
+    """
+    return json_loads(f.read(), lazy)
+
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_DELIMITER = re.compile(r'[ \t\n\r]*([,:\]}])')
+_SERIALIZED = re.compile(r'{[ \t\n\r]*"__class__"')
+_SCALAR_TYPES = frozenset(type(v) for v in [0, 0.0, 1 << 64, True, None])  # (1 << 64 is a long in Python 2)
+
+
+def _byte_strings(v):
+    """
+    Byte string conversion of a value coming from the C scanner, where all objects are already converted
+    """
+    if not _PY2:
+        return v
+    if isinstance(v, unicode):
+        return v.encode('utf-8')
+    elif isinstance(v, list):
+        if _SCALAR_TYPES.issuperset(map(type, v)):  # the number vectors, checked without a Python loop
+            return v
+        return [_byte_strings(e) for e in v]
+    else:
+        return v
+
+
+def _stream_decoder(chunk):
+    """
+    Object hook for the streaming decoder - nested objects have already passed here, so (unlike _decoder)
+    only the strings at this level need to be converted
+    """
+    if _PY2:
+        chunk = {k.encode('utf-8'): _byte_strings(v) for k, v in chunk.iteritems()}
+    if "__class__" in chunk and chunk["__class__"] in serializableClasses:
+        return _decoders[chunk["__class__"]](chunk)
+    return chunk
+
+
+class _StreamDecoder(object):
+    """
+    Incremental JSON decoder that reads the file in blocks, for indented files (a file without indentation
+    is read as a whole). The members of the top object and of the Serializable objects in it are decoded one
+    by one, the items of the arrays in them in batches, but all these values are decoded as a whole by the C
+    scanner. The ends of the values are found with the indentation (a raw new line can only be white space):
+    only the text of one member or a batch of items is kept.
+    """
+
+    def __init__(self, fp, block_size):
+        self.fp = fp
+        self.block_size = block_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+        self.indent = None
+        self.scan_once = json.JSONDecoder(object_hook=_stream_decoder).scan_once
+
+    def more(self, size=None):
+        data = self.fp.read(size or self.block_size)
+        if not data:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + data
+        self.pos = 0
+        return True
+
+    def error(self, msg):
+        return ValueError("%s near: %r" % (msg, self.buf[self.pos:self.pos + 20]))
+
+    def skip(self):
+        """
+        Skip white space and return the next character ('' at end of input)
+        """
+        while True:
+            self.pos = _WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.more():
+                return ""
+
+    def read_until(self, ends):
+        """
+        Read until one of the texts ends follows pos in the buffer (all of the file without ends). The reads
+        double in size, so that a large member is copied a bounded number of times
+        """
+        searched = 0  # after pos, which moves with each read
+        while not self.eof:
+            if ends and any(self.buf.find(end, self.pos + searched) >= 0 for end in ends):
+                return
+            searched = max(len(self.buf) - self.pos - max(map(len, ends or [""])), 0)
+            self.more(max(self.block_size, len(self.buf) - self.pos))
+
+    def scan(self, scanner, ends=None):
+        """
+        The value (and its end) that scanner finds at pos, after reading it completely
+        """
+        self.read_until(ends)
+        while True:
+            try:
+                return scanner(self.buf, self.pos)
+            except (StopIteration, ValueError):
+                # a value that does not end as the indentation tells
+                if not self.more(max(self.block_size, len(self.buf) - self.pos)):
+                    raise self.error("Expecting value")
+
+    def delimiter(self, expected):
+        c = self.skip()
+        if not c or c not in expected:
+            raise self.error("Expecting %r delimiter" % expected[0])
+        self.pos += 1
+        return c
+
+    def value(self, level=0):
+        """
+        The value at pos, the member of an object at the given level of indentation
+        """
+        c = self.skip()
+        if self.indent != "" and len(self.buf) - self.pos < 256:
+            self.more()
+        if c == '{' and (level == 0 or self.indent and _SERIALIZED.match(self.buf, self.pos)):
+            return self.object(level)
+        if c == '[' and self.indent and self.buf.startswith("[\n", self.pos):
+            return self.array(level)
+        ends = None
+        if level and self.indent:
+            # the next key of the enclosing object, or its closing brace
+            ends = ["\n" + self.indent * level + '"', "\n" + self.indent * (level - 1) + '}']
+        v, self.pos = self.scan(self.scan_once, ends)
+        return _byte_strings(v)
+
+    def array(self, level):
+        """
+        Decode the (indented) array at pos in batches: the items up to the last item that starts in the buffer
+        """
+        self.pos += 1
+        items = []
+        start, close = "\n" + self.indent * (level + 1), "\n" + self.indent * level + "]"
+        while True:
+            end = self.buf.find(close, self.pos)
+            if end >= 0:  # the rest of the array
+                cut = end + len(close)
+                batch = "[" + self.buf[self.pos:cut]
+            else:
+                # the last line that starts an item (a deeper line goes on with white space, the last line
+                # of an item closes it)
+                cut = self.buf.rfind(start, self.pos)
+                while cut >= 0 and self.buf[cut + len(start):cut + len(start) + 1] in " \t]}":
+                    cut = self.buf.rfind(start, self.pos, cut)
+                cut = self.buf.rfind(',', self.pos, cut) if cut >= 0 else -1
+                if cut < 0:
+                    if not self.more(max(self.block_size, len(self.buf) - self.pos)):
+                        raise self.error("Expecting ']'")
+                    continue
+                batch = "[" + self.buf[self.pos:cut] + "]"
+            try:
+                items.extend(_byte_strings(self.scan_once(batch, 0)[0]))
+            except (StopIteration, ValueError):
+                raise self.error("Invalid array")
+            if end >= 0:
+                self.pos = cut
+                return items
+            self.pos = cut + 1
+
+    def object(self, level):
+        self.pos += 1
+        chunk = {}
+        if self.indent is None:
+            # white space before the first key: the unit of indentation, if there is a new line
+            self.read_until(['"', '}'])
+            space = _WHITESPACE.match(self.buf, self.pos).group()
+            self.indent = space[space.rfind("\n") + 1:] if "\n" in space else ""
+        if self.skip() == '}':
+            self.pos += 1
+        else:
+            while True:
+                if self.skip() != '"':
+                    raise self.error("Expecting property name")
+                key, self.pos = self.scan(lambda s, pos: scanstring(s, pos + 1), ['":'])
+                self.delimiter(':')
+                chunk[key] = self.value(level + 1)
+                if self.delimiter(',}') == '}':
+                    break
+        return _stream_decoder(chunk)
+
+
+def json_stream_load(f, block_size=1 << 16):
+    """
+    Streaming alternative to json_load, returning the same objects but reading f in blocks, with the text
+    of one member or a batch of array items in memory instead of the whole file
+    """
+    assert len(serializableClasses) > 0, "No serializable classes known - must call register(types) before decoding"
+    decoder = _StreamDecoder(f, block_size)
+    obj = decoder.value()
+    if decoder.skip():
+        raise decoder.error("Extra data")
+    return obj
+
+
+class MappedArray(Sequence):
+    """
+    A read-only number vector of a binary data file (see binary_load), viewing the memory map of the file
+    without copying the numbers. The view is a memoryview (or a numpy array with Python 2), which keeps the map
+    open as long as it is used. It compares equal to a list with the same numbers and is dumped as a list
+    """
+    __slots__ = ("view",)
+
+    def __init__(self, view):
+        self.view = view
+
+    def tolist(self):
+        return self.view.tolist()
+
+    def __len__(self):
+        return len(self.view)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return MappedArray(self.view[i])
+        v = self.view[i]
+        return v.item() if hasattr(v, "item") else v
+
+    def __iter__(self):
+        return iter(self.view) if isinstance(self.view, memoryview) else iter(self.view.tolist())
+
+    def __array__(self, dtype=None, copy=None):
+        return np.asarray(self.view, dtype)
+
+    def __eq__(self, other):
+        return isinstance(other, (MappedArray, SparseList, RunList, list, tuple)) and self.tolist() == list(other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __reduce__(self):
+        return list, (self.tolist(),)  # (copies, e.g. by copy.deepcopy and pickle, are plain lists)
+
+    def __repr__(self):
+        return "%s(%s)" % (self.__class__.__name__, self.tolist())
+
+
+_BINARY_HEADER = struct.Struct("<4sHcxQ")  # magic, version, byte order, length of the JSON skeleton
+_BINARY_MAGIC = b"MWOB"
+_BINARY_VERSION = 1
+_BYTE_ORDER = sys.byteorder[0].encode('ascii')  # 'l' or 'b'
+_MIN_ARRAY = 8  # shorter lists are kept in the JSON skeleton
+
+
+def _plain(o):
+    """
+    The plain JSON structure of o, with all Serializable objects replaced by their to_json representation
+    """
+    if isinstance(o, Serializable):
+        return _plain(o.to_json())
+    elif isinstance(o, dict):
+        return {k: _plain(v) for k, v in o.items()}
+    elif isinstance(o, (list, tuple)):
+        return [_plain(e) for e in o]
+    elif isinstance(o, MappedArray):
+        return o.tolist()
+    return o
+
+
+def _typecode(values):
+    """
+    The array typecode that can store all values without loss, None if there is none
+    """
+    if all(type(v) is float for v in values):
+        return 'd'
+    if all(type(v) is int and -2 ** 31 <= v < 2 ** 31 for v in values):
+        return 'i'
+    return None
+
+
+class _BinaryWriter(object):
+    """
+    Moves the number vectors of a plain JSON structure into a list of typed arrays (each aligned to 8 bytes).
+    A list of numbers is replaced by {"__array__": ref} and a list of equally long number rows, such as the
+    SparseList values, by one array per column {"__columns__": [ref, ...]}, where ref = [typecode, offset, count]
+    """
+
+    def __init__(self):
+        self.blob = []
+        self.size = 0
+
+    def add(self, typecode, values):
+        a = array.array(typecode, values)
+        data = a.tobytes() if hasattr(a, "tobytes") else a.tostring()
+        data += b"\0" * (-len(data) % 8)
+        ref = [typecode, self.size, len(values)]
+        self.blob.append(data)
+        self.size += len(data)
+        return ref
+
+    def columns(self, rows):
+        if not all(isinstance(r, list) and len(r) == len(rows[0]) for r in rows) or not len(rows[0]):
+            return None
+        columns = list(zip(*rows))
+        typecodes = [_typecode(c) for c in columns]
+        return None if None in typecodes else [self.add(tc, c) for tc, c in zip(typecodes, columns)]
+
+    def pack(self, o):
+        if isinstance(o, dict):
+            return {k: self.pack(v) for k, v in o.items()}
+        if isinstance(o, list):
+            if len(o) >= _MIN_ARRAY:
+                typecode = _typecode(o)
+                if typecode:
+                    return {"__array__": self.add(typecode, o)}
+                refs = self.columns(o)
+                if refs:
+                    return {"__columns__": refs}
+            return [self.pack(e) for e in o]
+        return o
+
+
+def binary_dump(obj, fp):
+    """
+    Dump obj in the binary format: a header, the JSON skeleton and the typed arrays (fp must be opened as binary)
+    """
+    writer = _BinaryWriter()
+    skeleton = json.dumps(writer.pack(_plain(obj)), sort_keys=True, separators=(',', ':'))
+    skeleton += " " * (-len(skeleton) % 8)
+    fp.write(_BINARY_HEADER.pack(_BINARY_MAGIC, _BINARY_VERSION, _BYTE_ORDER, len(skeleton)))
+    fp.write(skeleton.encode('utf-8'))
+    for data in writer.blob:
+        fp.write(data)
+
+
+def binary_load(f):
+    """
+    Load an object dumped by binary_dump (f must be opened as binary). The file is memory-mapped and the number
+    vectors are MappedArrays viewing the map, so they are not read until used. The map is closed when no
+    MappedArray uses it any more. The rows of the SparseList values (and all arrays of a file with another byte
+    order, or with Python 2 without numpy) are read from the map into lists
+    """
+    assert len(serializableClasses) > 0, "No serializable classes known - must call register(types) before decoding"
+    mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, version, byte_order, length = _BINARY_HEADER.unpack(mm[:_BINARY_HEADER.size])
+    if magic != _BINARY_MAGIC or version != _BINARY_VERSION:
+        raise ValueError("Not a binary data file of version %d" % _BINARY_VERSION)
+    start = _BINARY_HEADER.size + length
+    swap = byte_order != _BYTE_ORDER
+    view = hasattr(memoryview, "cast") or np is not None
+
+    def values(ref, copy=False):
+        typecode, offset, count = ref
+        a = array.array(str(typecode))
+        first = start + offset
+        if view and not swap and not copy:
+            if hasattr(memoryview, "cast"):
+                return MappedArray(memoryview(mm)[first:first + count * a.itemsize].cast(str(typecode)))
+            return MappedArray(np.frombuffer(mm, typecode, count, first))
+        data = mm[first:first + count * a.itemsize]
+        if hasattr(a, "frombytes"):
+            a.frombytes(data)
+        else:
+            a.fromstring(data)
+        if swap:
+            a.byteswap()
+        return a.tolist()
+
+    def decoder(chunk):
+        if "__array__" in chunk:
+            return values(chunk["__array__"])
+        if "__columns__" in chunk:
+            return [list(row) for row in zip(*[values(ref, True) for ref in chunk["__columns__"]])]
+        return _stream_decoder(chunk)
+
+    return json.loads(mm[_BINARY_HEADER.size:start].decode('utf-8'), object_hook=decoder)
+
+
+def _item_key(k):
+    return json.dumps(k, sort_keys=True)
+
+
+def _patch(base, new):
+    """
+    The patch turning the plain JSON structure base into new, None if they are equal. A patch is either
+    the new value (null given as {"__value__": null}), or a marked dict with the changes of a dict
+    ("__patch__"), the items of a Multidict ("__items__", keyed by the item keys) or a list of the same
+    length ("__list__")
+    """
+    if isinstance(base, dict) and isinstance(new, dict):
+        if base.get("__class__") == "Multidict" and new.get("__class__") == "Multidict":
+            items = {_item_key(k): v for k, v in base["items"]}
+            changes = _dict_patch(items, {_item_key(k): v for k, v in new["items"]})
+            if changes is None:
+                return None
+            return {"__items__": {"set": [[json.loads(k), v] for k, v in sorted(changes["set"].items())],
+                                  "del": [json.loads(k) for k in changes["del"]]}}
+        changes = _dict_patch(base, new)
+        return None if changes is None else {"__patch__": changes}
+    if isinstance(base, list) and isinstance(new, list) and len(base) == len(new):
+        changes = [[i, p] for i, p in enumerate(map(_patch, base, new)) if p is not None]
+        if not changes:
+            return None
+        if len(changes) < len(new) / 2:
+            return {"__list__": changes}
+    elif _same(base, new):
+        return None
+    return {"__value__": None} if new is None else new
+
+
+def _same(a, b):
+    # equal also in the JSON text, so that 1 and 1.0 or 0.0 and -0.0 are kept apart
+    if type(a) is type(b) and not isinstance(a, (dict, list)):
+        return a == b and (a != 0 or type(a) is not float or repr(a) == repr(b))
+    return a == b and json.dumps(a, sort_keys=True) == json.dumps(b, sort_keys=True)
+
+
+def _dict_patch(base, new):
+    changes = {k: _patch(base[k], v) if k in base else v for k, v in new.items()}
+    changes = {"set": {k: p for k, p in changes.items() if p is not None or k not in base},
+               "del": sorted(k for k in base if k not in new)}
+    return changes if changes["set"] or changes["del"] else None
+
+
+def _apply(base, patch):
+    """
+    Apply a patch from _patch on the plain JSON structure base (which is not changed)
+    """
+    if patch is None:
+        return base
+    if not isinstance(patch, dict):
+        return patch
+    if "__value__" in patch:
+        return patch["__value__"]
+    if "__patch__" in patch:
+        changes = patch["__patch__"]
+        new = {k: v for k, v in base.items() if k not in changes["del"]}
+        for k, p in changes["set"].items():
+            new[k] = _apply(base[k], p) if k in base else p
+        return new
+    if "__items__" in patch:
+        changes = patch["__items__"]
+        items = {_item_key(k): [k, v] for k, v in base["items"]}
+        for k in changes["del"]:
+            del items[_item_key(k)]
+        for k, p in changes["set"]:
+            key = _item_key(k)
+            items[key] = [k, _apply(items[key][1], p) if key in items else p]
+        return dict(base, items=list(items.values()))
+    if "__list__" in patch:
+        new = list(base)
+        for i, p in patch["__list__"]:
+            new[i] = _apply(base[i], p)
+        return new
+    return patch
+
+
+class DeltaCodec(object):
+    """
+    Delta encoding of objects (such as a series of solutions to the same problem) as patches against
+    a base object. The patches are plain JSON structures, stored as {"__delta__": <patch>}.
+    With chained=True each object dumped or loaded becomes the base of the next one, so that a series
+    is stored as patches against the previous object (and must be loaded in the same order).
+    Every keyframe:th object of a chained series is still patched against the base, stored as {"__key__": <patch>},
+    so that any object can be loaded from its last keyframe (see loads_at).
+    """
+
+    def __init__(self, base, chained=False, keyframe=10):
+        self.root = _plain(base)
+        self.base = self.root
+        self.chained = chained
+        self.keyframe = keyframe
+        self.count = 0
+
+    def patch(self, obj):
+        plain = _plain(obj)
+        key = self.chained and self.count % self.keyframe == 0
+        patch = _patch(self.root if key else self.base, plain)
+        if self.chained:
+            self.base = plain
+        self.count += 1
+        return {"__key__": patch} if key else {"__delta__": patch}
+
+    def plain(self, record):
+        """
+        The plain JSON structure of a record from patch (becoming the next base when chained)
+        """
+        plain = _apply(self.root, record["__key__"]) if "__key__" in record else _apply(self.base, record["__delta__"])
+        if self.chained:
+            self.base = plain
+        return plain
+
+    def apply(self, record):
+        return decode(self.plain(record))
+
+    def dumps(self, obj):
+        return json.dumps(self.patch(obj), sort_keys=True, separators=(',', ':'))
+
+    def loads(self, s):
+        return self.apply(json.loads(s))
+
+    def loads_at(self, records, k):
+        """
+        The k:th object of a series (records as returned by dumps). When chained, only the patches from the
+        last keyframe up to k are applied (at most keyframe of them)
+        """
+        patches = [json.loads(records[k])]
+        while self.chained and "__key__" not in patches[-1] and len(patches) <= k:
+            patches.append(json.loads(records[k - len(patches)]))
+        for record in reversed(patches[1:]):
+            self.plain(record)
+        return self.apply(patches[0])
+
+    def dump(self, obj, fp):
+        fp.write(self.dumps(obj))
+
+    def load(self, f):
+        return self.apply(json.load(f))
+
+
+def delta_dump(obj, base, fp):
+    """
+    Dump obj as a patch against the object base
+    """
+    DeltaCodec(base).dump(obj, fp)
+
+
+def delta_load(f, base):
+    """
+    Load an object dumped by delta_dump, given the same base object
+    """
+    return DeltaCodec(base).load(f)
+
+
+class LoadCache(object):
+    """
+    On-disk cache of loaded objects, stored as pickles in a directory. The entries are keyed by the absolute
+    file name, its size and modification time (so a changed file is loaded again), the lazy flag and the
+    Python major version (the strings are unicode in Python 3).
+    The least recently used entries are removed when the total size exceeds max_bytes.
+    """
+
+    SUFFIX = ".pickle"
+
+    def __init__(self, directory, max_bytes=1 << 30):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def entry(self, filename, lazy=False):
+        st = os.stat(filename)
+        key = "%s|%d|%r|%d|%d" % (os.path.abspath(filename), st.st_size, st.st_mtime, lazy, sys.version_info[0])
+        return os.path.join(self.directory, hashlib.sha1(key.encode("utf-8")).hexdigest() + self.SUFFIX)
+
+    def load(self, filename, lazy=False):
+        """
+        The object in filename (as json_load), from the cache if possible
+        """
+        entry = self.entry(filename, lazy)
+        try:
+            with open(entry, "rb") as fp:
+                obj = pickle.load(fp)
+            os.utime(entry, None)  # marks it as recently used
+            self.hits += 1
+            return obj
+        except (IOError, OSError, EOFError, pickle.UnpicklingError):
+            pass
+        with open(filename, "r") as fp:
+            obj = json_load(fp, lazy)
+        self.misses += 1
+        # write to a temporary file first, so that no one (e.g. another process) reads a partial entry
+        fd, tmp = tempfile.mkstemp(dir=self.directory)
+        with os.fdopen(fd, "wb") as fp:
+            pickle.dump(obj, fp, pickle.HIGHEST_PROTOCOL)
+        os.rename(tmp, entry)
+        self.evict()
+        return obj
+
+    def evict(self):
+        """
+        Remove the least recently used entries until the total size is at most max_bytes
+        """
+        entries = []
+        for fn in glob.glob(os.path.join(self.directory, "*" + self.SUFFIX)):
+            try:
+                st = os.stat(fn)
+                entries.append((st.st_mtime, st.st_size, fn))
+            except OSError:
+                pass
+        total = sum(e[1] for e in entries)
+        for _, size, fn in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            os.remove(fn)
+            total -= size
+
+    def clear(self):
+        for fn in glob.glob(os.path.join(self.directory, "*" + self.SUFFIX)):
+            os.remove(fn)
+
+
+_CASE_FILE = re.compile(r'^(.+)_(nw|tr|ma|cr-[^_.]+|sol[^_.]*)\.json$')
+
+
+def case_files(directory):
+    """
+    Find the data files in directory, grouped per case by the file name convention <name>_<kind>.json,
+    where kind is nw, tr, ma, cr-<id> or sol<id>
+    :return: dict {name: {kind: file name}}
+    """
+    cases = {}
+    for fn in sorted(glob.glob(os.path.join(directory, "*.json"))):
+        m = _CASE_FILE.match(os.path.basename(fn))
+        if m:
+            cases.setdefault(m.group(1), {})[m.group(2)] = fn
+    return cases
+
+
+def _load_case_file(job):
+    name, kind, fn, lazy = job
+    with open(fn, "r") as fp:
+        return name, kind, json_load(fp, lazy)
+
+
+def pool_map(func, jobs, size, types, processes=None):
+    """
+    The results of func(job) for all jobs (in their order), using a pool of worker processes, one job at a time.
+    The largest jobs (by size(job)) are handed out first, so that they don't end up last in some worker.
+    The types are registered in each worker (as well as here) since the workers do not share the registry.
+    :param processes: number of worker processes (default: number of cores), 1 runs the jobs in this process
+    """
+    register(types)
+    order = sorted(range(len(jobs)), key=lambda i: size(jobs[i]), reverse=True)
+    if processes == 1:
+        done = [func(jobs[i]) for i in order]
+    else:
+        pool = multiprocessing.Pool(processes, initializer=register, initargs=(types,))
+        try:
+            done = pool.map(func, [jobs[i] for i in order], chunksize=1)
+        finally:
+            pool.close()
+            pool.join()
+    results = [None] * len(jobs)
+    for i, res in zip(order, done):
+        results[i] = res
+    return results
+
+
+def load_cases(directory, types, processes=None, lazy=False):
+    """
+    Load all cases in directory (see case_files) using a pool of worker processes (see pool_map), one file per job.
+    :param types: the serializable classes, as for register
+    :param processes: number of worker processes (default: number of cores), 1 loads in this process
+    :return: dict {name: {kind: object}}
+    """
+    jobs = [(name, kind, fn, lazy) for name, files in sorted(case_files(directory).items())
+            for kind, fn in sorted(files.items())]
+    cases = {}
+    for name, kind, obj in pool_map(_load_case_file, jobs, lambda job: os.path.getsize(job[2]), types, processes):
+        cases.setdefault(name, {})[kind] = obj
+    return cases
 
 
 def names(prefix, fr, to):
@@ -185,17 +1466,24 @@ if __name__ == "__main__":
     md1 = Multidict({(1, 2): 12, (3, 4): 34})
     md2 = Multidict({(5, 6): 'Aa'})
     dump = json_dumps([md1, md2])
-    print dump
+    print(dump)
     register(locals().values())  # or register([Multidict])
     ml = json_loads(dump)
-    print ml
+    print(ml)
 
     l1 = [0.0, 0.0, 1.0, 0.0, 5.0, 0.0]
     sl = SparseList.floats(l1)
     dump = json_dumps(sl)
-    print dump
+    print(dump)
     sj = json_loads(dump)
-    print sj
-    print l1
-    print sj.as_list()
+    print(sj)
+    print(l1)
+    print(sj.as_list())
+
+    rl = RunList.binary([0.0, 1.0, 1.0, 0.0, 0.0, 1.0])
+    dump = json_dumps(rl)
+    print(dump)
+    rj = json_loads(dump)
+    print(rj, rj.as_list())
+    print(rj | RunList([(3, 4)], 6), rj & RunList([(2, 6)], 6))
 
@@ -1,174 +1,344 @@
 """
 Graphical plotting of the network and results - using matplotlib
 """
+import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib import gridspec
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import LineCollection, PolyCollection
+from matplotlib.colors import to_rgba, to_rgba_array
+from matplotlib.figure import Figure
+from matplotlib.transforms import Affine2D, blended_transform_factory
 from math import sqrt
 
 __author__ = 'tomas.liden@liu.se'
 
+MIN_LINE_PX = 3  # trains closer than this (on average, in pixels) are shown as occupancy bands
+BAND_PX = 4  # the width of the occupancy bands (in pixels)
+RED = to_rgba('red')
+GREEN = to_rgba('green')
 
-links = {}
-plot_links = []
-trains = {}
-
-
-def line_picker(event):
-    line = event.artist
-    if line in links:
-        link = links[line]
-        if link in plot_links:
-            idx = plot_links.index(link)
-            plot_links.pop(idx)
-            plot_dirs.pop(idx)
-            # print "Removed", link, "->", plot_links, plot_dirs
-            line.set_color('grey')
-        else:
-            last_node = plot_links[-1][plot_dirs[-1]] if len(plot_links) else None
-            plot_links.append(link)
-            if last_node == link[1]:
-                plot_dirs.append(0)
-            else:
-                d = 1 if event.mouseevent.button == 1 else 0
-                plot_dirs.append(d)
-            # print "Added", link, "->", plot_links, plot_dirs
-            line.set_color('blue')
-        td_graph.cla()
-        plot_traingraph(td_graph)
-    if line in trains:
-        s = trains[line]
-        col = 'green' if line.get_color() == 'red' else 'red'
-        if col == 'red':
-            me = event.mouseevent
-            td_graph.annotate(s, xy=(me.xdata, me.ydata), xycoords='data', xytext=(5, -2), textcoords='offset points')
-        for l in trains:
-            if trains[l] == s:
-                l.set_color(col)
-    event.canvas.draw()
 
+def bar_verts(x, y):
+    """
+    The rectangles of the bars x = [(start, length)] over y = (bottom, height), as for broken_barh
+    """
+    y0, h = y
+    return [[(x0, y0), (x0, y0 + h), (x0 + w, y0 + h), (x0 + w, y0)] for x0, w in x]
 
-double_track_links = []
-work_links = []
-plot_dirs = []
 
+class LinkGroup(object):
+    """
+    The train graph artists of one link. They are drawn from y = 0 and moved in place by the offset,
+    so that adding or removing another link only shifts them.
+    Only the trains and bars inside the shown time range are kept in the collections (see show)
+    """
 
-def plot(title, nw, tr, ts, ma, rs, sol):
+    def __init__(self, ax, dz):
+        self.offset = Affine2D()
+        self.data = self.offset + ax.transData  # y relative to the link start
+        self.axes_x = self.offset + blended_transform_factory(ax.transAxes, ax.transData)
+        self.dz = dz
+        self.z = 0.0
+        self.artists = []
+        self.lines = None  # the train segments
+        self.names = []  # the train of each segment
+        self.segments = None
+        self.colors = None
+        self.shown = None  # the indices of the segments in lines
+        self.bands = None  # the occupancy of the trains, instead of lines when zoomed out
+        self.bars = []  # (collection, x, y, colors) of the work and crew bars
+        self.labels = []  # (annotation, x) of the work values
+
+    def move(self, z):
+        if z != self.z:
+            self.offset.clear().translate(0, z)
+            self.z = z
+
+    def remove(self):
+        for a in self.artists:
+            a.remove()
+        if self.bands is not None:
+            self.bands.remove()
+
+    def plot_trains(self, ax, segments, names, colors):
+        self.names = names
+        self.segments = np.array(segments, dtype=float)
+        self.colors = to_rgba_array(colors)
+        self.shown = np.arange(len(names))
+        self.lines = LineCollection(segments, colors=colors, capstyle='projecting', picker=5, zorder=2,
+                                    transform=self.data)
+        self.artists.append(ax.add_collection(self.lines))
+
+    def train(self, i):
+        """
+        The train of segment i in lines
+        """
+        return self.names[self.shown[i]]
+
+    def plot_bars(self, ax, x, y, colors, scale=None, **kwargs):
+        """
+        Bars x = [(start, length)] over y = (bottom, height), with y first transformed by scale (if given)
+        """
+        transform = self.data if scale is None else scale + self.data
+        bars = ax.broken_barh(x, y, facecolors=colors, linewidth=0.0, transform=transform, **kwargs)
+        self.bars.append((bars, x, y, colors))
+        self.artists.append(bars)
+
+    def show(self, ax, x0, x1):
+        """
+        Keep only the trains, bars and labels inside the time range [x0, x1] - and when the trains get too dense
+        for the axes, show their occupancy in bands (with only the red trains as lines)
+        """
+        if self.bands is not None:
+            self.bands.remove()
+            self.bands = None
+        if self.lines is not None:
+            starts = self.segments[:, 0, 0]
+            ends = self.segments[:, 1, 0]
+            inside = (ends >= x0) & (starts <= x1)
+            dense = False
+            if inside.any():  # compare with the width (in pixels) of the shown time with trains
+                span = min(x1, ends[inside].max()) - max(x0, starts[inside].min())
+                dense = inside.sum() * MIN_LINE_PX > span / (x1 - x0) * ax.bbox.width
+            if dense:
+                # the number of trains in each band
+                edges = np.linspace(x0, x1, max(1, int(ax.bbox.width / BAND_PX)) + 1)
+                s = starts[inside, np.newaxis]
+                e = ends[inside, np.newaxis]
+                count = ((s < edges[np.newaxis, 1:]) & (e > edges[np.newaxis, :-1])).sum(axis=0)
+                bins = np.nonzero(count)[0]
+                x = [(edges[i], edges[i + 1] - edges[i]) for i in bins]
+                c = [(0.0, 0.5, 0.0, float(count[i]) / count.max()) for i in bins]
+                self.bands = PolyCollection(bar_verts(x, (0.0, self.dz)), facecolors=c, linewidth=0.0, zorder=1.5,
+                                            transform=self.data)
+                ax.add_collection(self.bands, autolim=False)  # (no autoscaling to the bands)
+                inside &= (self.colors == RED).all(axis=1)
+            self.shown = np.nonzero(inside)[0]
+            self.lines.set_segments(self.segments[self.shown])
+            self.lines.set_color(self.colors[self.shown])
+        for bars, x, y, colors in self.bars:
+            shown = [i for i, (start, length) in enumerate(x) if start <= x1 and start + length >= x0]
+            bars.set_verts(bar_verts([x[i] for i in shown], y))
+            bars.set_facecolor([colors[i] for i in shown])
+        for label, x in self.labels:
+            label.set_visible(x0 <= x <= x1)
+
+
+class TrainGraph(object):
     """
-    Creating a basic network plot
-    :param title: the text to show as window title
-    :param nw: the network data (class Network)
-    :param tr: the traffic data (class Traffic)
-    :param ts: the additional train sets (class TrainSets)
-    :param ma: the maintenance data (class Maintenance)
-    :param rs: the resource data (class Resources)
-    :param sol: a planning solution (class Solution)
-    :return: the figure (class Figure)
+    The network plot and the train and work graph of a solution, along the longest route of the network.
+    All the plot state is kept here, so that any number of them can be drawn (see draw)
     """
-    global plot_links, double_track_links, work_links, plot_dirs
-    r = max(nw.routes.items(), key=lambda kv: len(kv[1]))[0]
-    plot_links = list(nw.route_links[r])
-    double_track_links = [l for l in nw.links if not nw.single_track(l)]
-    work_links = list(ma.work_volume.keys())
-    plot_dirs = list(nw.route_dirs[r])
-
-    # noinspection PyGlobalUndefined
-    global td_graph, nw_graph, traffic, train_dirs, solution, bases, crew
-    fig = plt.figure(figsize=(12, 8))
-    fig.canvas.set_window_title(title)
-    gs = gridspec.GridSpec(2, 1, height_ratios=(2, 1))
-    td_graph = plt.subplot(gs[0])
-    nw_graph = plt.subplot(gs[1])
-    plot_network(nw, nw_graph)
-    fig.canvas.mpl_connect('pick_event', line_picker)
-    traffic = tr
-    train_dirs = ts.dirs_over
-    solution = sol
-    if rs:
-        bases = rs.bases
-        crew = rs.all_crew
-    plot_traingraph(td_graph)
-    plt.show(block=True)  # stop here until done
 
-# Node coordinates
-x_n = {}
-y_n = {}
-
-
-def length(l):
-    fr, to = l
-    return sqrt((x_n[fr] - x_n[to])**2 + (y_n[fr] - y_n[to])**2)
-
-
-def plot_network(nw, ax):
-    ax.set_title('Network')
-    ax.set_xticklabels([], visible=False)
-    ax.set_xticks([])
-    ax.set_yticklabels([], visible=False)
-    ax.set_yticks([])
-    ax.margins(0.05, 0.15)
-    x, y = zip(*nw.nodes.values())
-    ax.scatter(x, y, zorder=2)
-    for i, n in enumerate(nw.nodes.keys()):
-        x_n[n] = x[i]
-        y_n[n] = y[i]
-        ax.annotate(n, (x_n[n], y_n[n]), xytext=(-4, 5), textcoords='offset points')
-    for link in nw.links:
-        fr = link[0]
-        to = link[1]
-        col = 'blue' if link in plot_links else 'grey'
-        line, = ax.plot([x_n[fr], x_n[to]], [y_n[fr], y_n[to]], col, picker=5, zorder=1)
-        if link in double_track_links:
-            line.set_linewidth(3)
-            ax.plot([x_n[fr], x_n[to]], [y_n[fr], y_n[to]], 'white', zorder=1)
-        links[line] = link
-
-
-def plot_traingraph(ax):
-    if not traffic or not solution:
-        return
-    nodes = []
-    ticks = []
-    z = 0.0
-    z_l = {}
-    # plot the y axis with station markers and horizontal bars between line sequences
-    for i, l in enumerate(plot_links):
-        fr = l[1 - plot_dirs[i]]
-        to = l[plot_dirs[i]]
-        dz = length(l)
-        if len(nodes) == 0 or fr != nodes[-1]:
-            if len(nodes) > 0:
-                ax.axhspan(z, z + 0.1, fc='grey', alpha=0.5)
-                z += 0.1
-            nodes.append(fr)
+    def __init__(self, nw, tr, ts, ma, rs, sol):
+        """
+        :param nw: the network data (class Network)
+        :param tr: the traffic data (class Traffic)
+        :param ts: the additional train sets (class TrainSets)
+        :param ma: the maintenance data (class Maintenance)
+        :param rs: the resource data (class Resources), or None
+        :param sol: a planning solution (class Solution), or None
+        """
+        r = max(nw.routes.items(), key=lambda kv: len(kv[1]))[0]
+        self.network = nw
+        self.traffic = tr
+        self.train_dirs = ts.dirs_over
+        self.solution = sol
+        self.bases = rs.bases if rs else {}
+        self.crew = rs.all_crew if rs else []
+        self.plot_links = list(nw.route_links[r])
+        self.plot_dirs = list(nw.route_dirs[r])
+        self.double_track_links = [l for l in nw.links if not nw.single_track(l)]
+        self.work_links = list(ma.work_volume.keys())
+        self.x_n = {}  # node coordinates
+        self.y_n = {}
+        for n, (x, y) in nw.nodes.items():
+            self.x_n[n] = x
+            self.y_n[n] = y
+        self.td_graph = None
+        self.nw_graph = None
+        self.links = {}  # the link of each line in the network plot
+        self.trains = {}  # the LinkGroup of each LineCollection in the train graph
+        self.train_lines = {}  # the (LinkGroup, segment index) of each train in the train graph
+        self.highlighted = {}  # the trains shown in red, with their name annotations
+        self.link_groups = {}  # the train graph artists per link, see LinkGroup
+        self.separators = []  # the markers between the links in the train graph
+        self.min_len = None  # shortest plotted link
+        self.crew_scale = Affine2D()  # the crew bar heights are given in units of min_len
+        self.time_range = None  # the shown part of the train graph, see show_time
+
+    def draw(self, fig):
+        """
+        Draw the train graph (above) and the network into fig
+        """
+        gs = gridspec.GridSpec(2, 1, height_ratios=(2, 1))
+        self.td_graph = fig.add_subplot(gs[0])
+        self.nw_graph = fig.add_subplot(gs[1])
+        self.plot_network(self.nw_graph)
+        self.plot_traingraph(self.td_graph)
+
+    def length(self, l):
+        fr, to = l
+        return sqrt((self.x_n[fr] - self.x_n[to])**2 + (self.y_n[fr] - self.y_n[to])**2)
+
+    def add_link(self, link, d):
+        """
+        Add link (in direction d) last in the train graph
+        """
+        self.plot_links.append(link)
+        self.plot_dirs.append(d)
+        if self.solution and self.traffic:
+            self.plot_link(self.td_graph, link, d)
+            self.layout(self.td_graph)
+
+    def remove_link(self, link):
+        """
+        Remove link from the train graph, moving the links after it
+        """
+        idx = self.plot_links.index(link)
+        self.plot_links.pop(idx)
+        self.plot_dirs.pop(idx)
+        if link in self.link_groups:
+            self.remove_group(link)
+            self.layout(self.td_graph)
+
+    def remove_group(self, link):
+        group = self.link_groups.pop(link)
+        group.remove()
+        if group.lines is not None:
+            del self.trains[group.lines]
+            for s in set(group.names):
+                self.train_lines[s] = [(g, j) for g, j in self.train_lines[s] if g is not group]
+
+    def highlight(self, s, xy=None):
+        """
+        Show the lines of train s in red, with its name at xy - or back in green when xy is None
+        """
+        col = RED if xy is not None else GREEN
+        if s in self.highlighted:
+            self.highlighted.pop(s).remove()
+        if xy is not None:
+            self.highlighted[s] = self.td_graph.annotate(s, xy=xy, xycoords='data', xytext=(5, -2),
+                                                         textcoords='offset points')
+        groups = set()
+        for group, j in self.train_lines.get(s, []):
+            group.colors[j] = col
+            groups.add(group)
+        for group in groups:
+            if self.time_range:  # (a red train is shown also in the occupancy bands)
+                group.show(self.td_graph, *self.time_range)
+            else:
+                group.lines.set_color(group.colors[group.shown])
+
+    def show_time(self, x0, x1):
+        """
+        Show the time range [x0, x1] of the train graph (see LinkGroup.show)
+        """
+        self.time_range = (x0, x1)
+        for group in self.link_groups.values():
+            group.show(self.td_graph, x0, x1)
+
+    def plot_network(self, ax):
+        ax.set_title('Network')
+        ax.set_xticklabels([], visible=False)
+        ax.set_xticks([])
+        ax.set_yticklabels([], visible=False)
+        ax.set_yticks([])
+        ax.margins(0.05, 0.15)
+        nodes = list(self.network.nodes.keys())
+        ax.scatter([self.x_n[n] for n in nodes], [self.y_n[n] for n in nodes], zorder=2)
+        for n in nodes:
+            ax.annotate(n, (self.x_n[n], self.y_n[n]), xytext=(-4, 5), textcoords='offset points')
+        for link in self.network.links:
+            fr = link[0]
+            to = link[1]
+            col = 'blue' if link in self.plot_links else 'grey'
+            line, = ax.plot([self.x_n[fr], self.x_n[to]], [self.y_n[fr], self.y_n[to]], col, picker=5, zorder=1)
+            if link in self.double_track_links:
+                line.set_linewidth(3)
+                ax.plot([self.x_n[fr], self.x_n[to]], [self.y_n[fr], self.y_n[to]], 'white', zorder=1)
+            self.links[line] = link
+
+    def plot_traingraph(self, ax):
+        if not self.traffic or not self.solution:
+            return
+        self.link_groups.clear()
+        self.trains.clear()
+        self.train_lines.clear()
+        self.highlighted.clear()
+        del self.separators[:]
+        self.min_len = min(self.length(l) for l in self.plot_links) if self.plot_links else None
+        self.crew_scale.clear().scale(1.0, self.min_len or 1.0)
+        ax.set_title('Train and work graph')
+        for i, l in enumerate(self.plot_links):
+            self.plot_link(ax, l, self.plot_dirs[i])
+        self.layout(ax)
+
+    def layout(self, ax):
+        """
+        Place the links of the train graph after each other (in plot_links order), with the station names
+        on the y axis and horizontal bars between line sequences
+        """
+        plot_links = self.plot_links
+        plot_dirs = self.plot_dirs
+        shortest = min(self.length(l) for l in plot_links) if plot_links else None
+        if shortest != self.min_len:
+            self.min_len = shortest
+            if shortest:  # resizes the crew bars of all links
+                self.crew_scale.clear().scale(1.0, shortest)
+        for a in self.separators:
+            a.remove()
+        del self.separators[:]
+        nodes = []
+        ticks = []
+        z = 0.0
+        for i, l in enumerate(plot_links):
+            fr = l[1 - plot_dirs[i]]
+            to = l[plot_dirs[i]]
+            if len(nodes) == 0 or fr != nodes[-1]:
+                if len(nodes) > 0:
+                    self.separators.append(ax.axhspan(z, z + 0.1, fc='grey', alpha=0.5))
+                    z += 0.1
+                nodes.append(fr)
+                ticks.append(z)
+            else:
+                self.separators.append(ax.axhline(z, c='k', ls=':'))
+            self.link_groups[l].move(z)
+            z += self.length(l)
+            nodes.append(to)
             ticks.append(z)
-        else:
-            ax.axhline(z, c='k', ls=':')
-        z_l[l] = [z, z + dz]
-        nodes.append(to)
-        ticks.append(z + dz)
-        z += dz
-    ax.set_title('Train and work graph')
-    ax.set_yticks(ticks)
-    ax.set_yticklabels(nodes)
-    # shortest link length
-    min_len = min(z_l[l][1] - z_l[l][0] for l in plot_links)
-    # plot the solution data
-    tr_sol = solution.train_sol
-    ma_sol = solution.maint_sol
-    cr_sol = solution.crew_sol
-    for i, l in enumerate(plot_links):
-        # plot trains running over l
+        ax.set_yticks(ticks)
+        ax.set_yticklabels(nodes)
+        if z > 0:
+            ax.set_ylim(-0.05 * z, 1.05 * z)
+
+    def plot_link(self, ax, l, d):
+        """
+        Plot the trains, work windows and crew assignments of link l (in direction d) into a new LinkGroup
+        """
+        dz = self.length(l)
+        group = self.link_groups[l] = LinkGroup(ax, dz)
+        train_dirs = self.train_dirs
+        tr_sol = self.solution.train_sol
+        ma_sol = self.solution.maint_sol
+        cr_sol = self.solution.crew_sol
+        # plot trains running over l, as one collection with a segment per train
+        segments = []
+        names = []
         for s in train_dirs[l]:
             if (s, l) in tr_sol.ey:
-                x = [tr_sol.ey[s, l], tr_sol.ex[s, l]]
-                y = z_l[l]
-                if train_dirs[l][s] != plot_dirs[i]:
-                    y = z_l[l][::-1]
-                line, = ax.plot(x, y, 'green', picker=5)
-                trains[line] = s
+                y = (0.0, dz) if train_dirs[l][s] == d else (dz, 0.0)
+                segments.append(((tr_sol.ey[s, l], y[0]), (tr_sol.ex[s, l], y[1])))
+                names.append(s)
+        if segments:
+            group.plot_trains(ax, segments, names, [RED if s in self.highlighted else GREEN for s in names])
+            self.trains[group.lines] = group
+            for j, s in enumerate(names):
+                self.train_lines.setdefault(s, []).append((group, j))
         # plot work windows
-        tr = traffic
-        if l in work_links:
+        tr = self.traffic
+        if l in self.work_links:
             x = []
             c = []
             for t in tr.periods:
@@ -178,29 +348,127 @@ def plot_traingraph(ax):
                     c.append((1, 1, 1 - value))  # level of yellow show sol-value
                     if value < 1.0:
                         px = tr.period_starts[t] + 0.5 * tr.period_lengths[t]
-                        py = z_l[l][0] + 0.5 * length(l)
-                        ax.annotate(format(value, ".2f"), (px, py))
-            ax.broken_barh(x, (z_l[l][0], length(l)), facecolors=c, linewidth=0.0)
+                        label = ax.annotate(format(value, ".2f"), (px, 0.5 * dz), xycoords=group.data)
+                        group.labels.append((label, px))
+                        group.artists.append(label)
+            group.plot_bars(ax, x, (0.0, dz), c)
             # plot the crew assignments
             if cr_sol:
                 crew_colors = ['red', 'blue', 'black', 'orange', 'green', 'gray', 'cyan', 'pink', 'brown', 'magenta']
                 # Other color maps: seismic, flag, gnuplot2, gnuplot, terrain
-                for ki, k in enumerate(crew):
-                    x = []
-                    y = (z_l[l][0] + 0.25 * min_len, 0.35 * min_len)
-                    col = crew_colors[ki % len(crew_colors)]
+                bars = {}  # (x, colors) per hatching - the unused crew are hatched
+                for ki, k in enumerate(self.crew):
                     if (l, k) in cr_sol.d:
+                        x, c = bars.setdefault('|||' if cr_sol.q[k] < 0.1 else None, ([], []))
                         for t in tr.periods:
                             if cr_sol.d[l, k][t] > 0.1:
                                 x.append((tr.period_starts[t], tr.period_lengths[t]))
+                                c.append(crew_colors[ki % len(crew_colors)])
+                for hatching, (x, c) in sorted(bars.items(), key=lambda kv: kv[0] is not None):
                     if len(x):
-                        hatching = '|||' if cr_sol.q[k] < 0.1 else None
-                        ax.broken_barh(x, y, facecolor=col, linewidth=0.0, edgecolor='white', hatch=hatching)
-    # plot double track markers
-    for i, l in enumerate(plot_links):
-        if l in double_track_links:
-            y = [z_l[l][0] / z, z_l[l][1] / z]
-            # This transform fixes both x and y - but ideally we would like y to follow the data
-            # in order to adjust to manual zoom & pan
-            ax.plot([-0.004, -0.004], y, 'black', clip_on=False, transform=ax.transAxes)
-            ax.plot([1.004, 1.004], y, 'black', clip_on=False, transform=ax.transAxes)
+                        group.plot_bars(ax, x, (0.25, 0.35), c, scale=self.crew_scale, edgecolor='white',
+                                        hatch=hatching)
+        # plot double track markers (in axes x, following the data in y)
+        if l in self.double_track_links:
+            markers = [((x, 0.0), (x, dz)) for x in (-0.004, 1.004)]
+            markers = LineCollection(markers, colors='black', capstyle='projecting', clip_on=False, zorder=2,
+                                     transform=group.axes_x)
+            group.artists.append(ax.add_collection(markers, autolim=False))
+        if self.time_range:
+            group.show(ax, *self.time_range)
+
+
+class TrainGraphView(TrainGraph):
+    """
+    A TrainGraph in a window of its own, so that several can be shown at once (e.g. opt and best side by side).
+    Clicking a link in the network adds it to (or removes it from) the train graph and clicking a train
+    shows it in red. Panning and zooming only draws the shown time range (see show_time).
+    The plot state is released when the window is closed
+    """
+
+    def __init__(self, title, nw, tr, ts, ma, rs, sol):
+        """
+        :param title: the text to show as window title
+        """
+        TrainGraph.__init__(self, nw, tr, ts, ma, rs, sol)
+        self.figure = plt.figure(figsize=(12, 8))
+        canvas = self.figure.canvas
+        if canvas.manager is not None:  # (no window when rendering to a file)
+            canvas.manager.set_window_title(title)
+        self.draw(self.figure)
+        # (bound methods are only weakly referenced by the canvas)
+        self.cids = [canvas.mpl_connect('pick_event', lambda event: self.pick(event)),
+                     canvas.mpl_connect('resize_event', lambda event: self.show_time(*self.td_graph.get_xlim())),
+                     canvas.mpl_connect('close_event', lambda event: self.release())]
+        self.xlim_cid = self.td_graph.callbacks.connect('xlim_changed', lambda ax: self.show_time(*ax.get_xlim()))
+        self.show_time(*self.td_graph.get_xlim())
+
+    def pick(self, event):
+        line = event.artist
+        if line in self.links:
+            link = self.links[line]
+            if link in self.plot_links:
+                self.remove_link(link)
+                line.set_color('grey')
+            else:
+                last_node = self.plot_links[-1][self.plot_dirs[-1]] if len(self.plot_links) else None
+                if last_node == link[1]:
+                    d = 0
+                else:
+                    d = 1 if event.mouseevent.button == 1 else 0
+                self.add_link(link, d)
+                line.set_color('blue')
+        if line in self.trains:
+            me = event.mouseevent
+            for s in set(self.trains[line].train(i) for i in event.ind):
+                self.highlight(s, (me.xdata, me.ydata) if s not in self.highlighted else None)
+        event.canvas.draw_idle()
+
+    def close(self):
+        plt.close(self.figure)
+        self.release()
+
+    def release(self):
+        """
+        Disconnect from the figure and drop the artists
+        """
+        for cid in self.cids:
+            self.figure.canvas.mpl_disconnect(cid)
+        del self.cids[:]
+        self.td_graph.callbacks.disconnect(self.xlim_cid)
+        for d in (self.links, self.trains, self.train_lines, self.highlighted, self.link_groups):
+            d.clear()
+        del self.separators[:]
+
+
+def plot(title, nw, tr, ts, ma, rs, sol):
+    """
+    Creating a basic network plot
+    :param title: the text to show as window title
+    :param nw: the network data (class Network)
+    :param tr: the traffic data (class Traffic)
+    :param ts: the additional train sets (class TrainSets)
+    :param ma: the maintenance data (class Maintenance)
+    :param rs: the resource data (class Resources)
+    :param sol: a planning solution (class Solution)
+    :return: the view (class TrainGraphView)
+    """
+    view = TrainGraphView(title, nw, tr, ts, ma, rs, sol)
+    plt.show(block=True)  # stop here until done
+    return view
+
+
+def render(filename, nw, tr, ts, ma, rs, sol, title=None, dpi=100):
+    """
+    Draw the plot of a solution (as by plot) to an image file, with the Agg backend and no window.
+    The format is given by the file extension, e.g. png or svg
+    :param title: the text to show above the plots
+    :return: the figure (class Figure)
+    """
+    fig = Figure(figsize=(12, 8))
+    FigureCanvasAgg(fig)
+    if title:
+        fig.suptitle(title)
+    TrainGraph(nw, tr, ts, ma, rs, sol).draw(fig)
+    fig.savefig(filename, dpi=dpi)
+    return fig
@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+"""
+Rendering of the solutions to image files, without any windows
+Usage: render.py <cases directory> <destination directory> [png|svg]
+All solutions (*_sol*.json) in the cases directory are rendered, using a pool of worker processes
+"""
+import os
+import sys
+import matplotlib
+matplotlib.use("Agg")
+from network import Network
+from traffic import Traffic
+from maintenance import Maintenance
+from resources import Resources
+from train_sets import TrainSets
+import solution
+import plotter
+from persist import case_files, json_load, pool_map
+
+__author__ = 'tomas.liden@liu.se'
+
+TYPES = [Network, Traffic, Maintenance, Resources] + solution.types
+
+
+def render_solution(job):
+    """
+    Render one solution, job = (the case files (see case_files), the solution kind, destination, format)
+    :return: the image file name
+    """
+    files, kind, out_dir, fmt = job
+    objs = {}
+    for k in ["nw", "tr", "ma", kind]:
+        with open(files[k], "r") as fp:
+            objs[k] = json_load(fp)
+    sol = objs[kind]
+    rs = None
+    if "resources" in sol.opt_par:
+        with open(files[sol.opt_par["resources"]], "r") as fp:
+            rs = json_load(fp)
+    train_win = sol.opt_par["train_win"] if "train_win" in sol.opt_par else objs["tr"].period_starts[-1]
+    ts = TrainSets.setup(objs["nw"], objs["tr"], train_win)
+    name = os.path.splitext(os.path.basename(files[kind]))[0]
+    out = os.path.join(out_dir, name + "." + fmt)
+    plotter.render(out, objs["nw"], objs["tr"], ts, objs["ma"], rs, sol, title=name)
+    return out
+
+
+def render_cases(cases, out_dir, fmt="png", processes=None):
+    """
+    Render all solutions in the cases directory to out_dir, one job per solution (see pool_map).
+    A solution is drawn with the resources named by opt_par["resources"], otherwise without resources
+    (there may be several per case), as read_and_plot does
+    :param fmt: the image format, png or svg
+    :param processes: number of worker processes (default: number of cores), 1 renders in this process
+    :return: the image file names
+    """
+    jobs = [(files, kind, out_dir, fmt) for name, files in sorted(case_files(cases).items())
+            for kind in sorted(k for k in files if k.startswith("sol"))]
+    return pool_map(render_solution, jobs, lambda job: os.path.getsize(job[0][job[1]]), TYPES, processes)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (3, 4) or sys.argv[3:] not in ([], ["png"], ["svg"]):
+        print("Usage: %s <cases directory> <destination directory> [png|svg]" % sys.argv[0])
+        sys.exit(1)
+    src, dst = sys.argv[1:3]
+    if not os.path.isdir(dst):
+        os.makedirs(dst)
+    for fn in render_cases(src, dst, *sys.argv[3:]):
+        print(fn)
@@ -1,12 +1,20 @@
 """
 Resource data for maintenance crew considerations
 """
-from persist import Serializable, tupleify
+from persist import Serializable, Field, DICT, tuples
 
 __author__ = 'tomas.liden@liu.se'
 
 
 class Resources(Serializable):
+    fields = (
+        Field("bases"),
+        Field("base_links", DICT, element=tuples),
+        Field("base_crew"),
+        Field("limits"),
+        Field("costs")
+    )
+
     def __init__(self, bases, base_links, base_crew, limits, costs):
         Serializable.__init__(self)
         self.bases = bases
@@ -27,7 +35,7 @@ class Resources(Serializable):
         # provide attributes for convenience (and safeguarding that these values really exist)
         self.max_work = self.limits['max_work']
         self.min_rest = self.limits['min_rest']
-        self.cyclic = self.limits["cyclic"]
+        self.cyclic = self.limits["cyclic"] if "cyclic" in self.limits else False
         self.crew_cost = self.costs["crew_cost"]
         self.work_cost = self.costs["work_cost"]
         self.link_cost = self.costs["link_cost"] if "link_cost" in self.costs else 0
@@ -42,22 +50,3 @@ class Resources(Serializable):
             "Crews[l]   : %s" % str(self.crews),
             "Links[k]   : %s" % str(self.links)
         ])
-
-    def to_json(self):
-        return self.rep({
-            "bases": self.bases,
-            "base_links": self.base_links,
-            "base_crew": self.base_crew,
-            "limits": self.limits,
-            "costs": self.costs
-        })
-
-    @staticmethod
-    def from_json(chunk):
-        return Resources(
-            chunk["bases"],
-            {k: tupleify(v) for k, v in chunk["base_links"].items()},
-            chunk["base_crew"],
-            chunk["limits"],
-            chunk["costs"]
-        )
@@ -1,15 +1,43 @@
 """
 A solution to the maintenance window optimization problem
 """
+from __future__ import print_function
 import datetime
 import os
-from persist import Serializable, Multidict, SparseList
+from persist import Serializable, Field, MULTIDICT, SparseList, RunList, LazyAttribute
 
 __author__ = 'tomas.liden@liu.se'
 
 
+def _packed(ls):
+    """
+    The per period values ls as a RunList when they are all 0 or 1, otherwise as a SparseList
+    """
+    rl = RunList.binary(ls)
+    return rl if rl is not None else SparseList.floats(ls)
+
+
+def _compact(ls):
+    """
+    As _packed, unless the dense list is shorter in the (indented) json files
+    """
+    pl = _packed(ls)
+    return pl if 4 * len(pl.runs if isinstance(pl, RunList) else pl.values) + 4 < len(pl) else ls
+
+
 # noinspection PyPep8Naming
 class TrainSolution(Serializable):
+    variables = ("z", "ey", "ex", "eO", "eD", "f", "xy", "xx", "u", "n0", "n1")
+    fields = (
+        Field("z", MULTIDICT, key=2),
+        Field("eO"),
+        Field("eD"),
+        Field("f"),
+        Field("n0", MULTIDICT, key=2),
+        Field("n1", MULTIDICT, key=2),
+        Field("e_u_x", MULTIDICT, key=(1, 2))
+    )
+
     def __init__(self, z, ey, ex, eO, eD, f, xy, xx, u, n0, n1):
         Serializable.__init__(self)
         self.z = z
@@ -40,58 +68,44 @@ class TrainSolution(Serializable):
             "- n1    : %s" % str(self.n1)
         ])
 
-    def to_json(self):
-        packed = {}
-        for k in self.ey.keys():
-            packed[k] = (self.ey[k],
-                         self.ex[k],
-                         SparseList.floats(self.u[k]),
-                         SparseList.floats(self.xy[k]),
-                         SparseList.floats(self.xx[k]))
-        return self.rep({
-            "z": Multidict(self.z),
-            "eO": self.eO,
-            "eD": self.eD,
-            "f": self.f,
-            "n0": Multidict(self.n0),
-            "n1": Multidict(self.n1),
-            "e_u_x": Multidict(packed)
-        })
-
-    @staticmethod
-    def from_json(chunk):
+    @property
+    def e_u_x(self):
+        """
+        The entry and exit values together with the packed period values u, xy and xx, per key - as stored
+        """
+        return {k: (self.ey[k], self.ex[k], _packed(self.u[k]), _packed(self.xy[k]), _packed(self.xx[k]))
+                for k in self.ey.keys()}
+
+    @classmethod
+    def from_json(cls, chunk):
+        if "e_u_x" in chunk:
+            return super(TrainSolution, cls).from_json(chunk)
+        # the variables were stored one by one before
+        return TrainSolution(chunk["z"].data, chunk["ey"].data, chunk["ex"].data, chunk["eO"], chunk["eD"],
+                             chunk["f"], chunk["xy"].data, chunk["xx"].data, chunk["u"].data,
+                             chunk["n0"].data, chunk["n1"].data)
+
+    @classmethod
+    def from_fields(cls, e_u_x, **values):
         ey = {}
         ex = {}
         u = {}
         xy = {}
         xx = {}
-        if "e_u_x" in chunk:
-            for k in chunk["e_u_x"].data.keys():
-                v = chunk["e_u_x"].data[k]
-                ey[k], ex[k] = v[0], v[1]
-                u[k], xy[k], xx[k] = v[2].as_list(), v[3].as_list(), v[4].as_list()
-        else:
-            ey = chunk["ey"].data
-            ex = chunk["ex"].data
-            u = chunk["u"].data
-            xy = chunk["xy"].data
-            xx = chunk["xx"].data
-        return TrainSolution(
-            chunk["z"].data,
-            ey,
-            ex,
-            chunk["eO"],
-            chunk["eD"],
-            chunk["f"],
-            xy,
-            xx,
-            u,
-            chunk["n0"].data,
-            chunk["n1"].data
-        )
+        for k, v in e_u_x.items():
+            ey[k], ex[k], u[k], xy[k], xx[k] = v
+        return cls(ey=ey, ex=ex, u=u, xy=xy, xx=xx, **values)
 
 
 class MaintSolution(Serializable):
+    variables = ("w", "y", "v")
+    # the per period values are mostly zero, with the work in short runs of 1.0 (dense lists in old files)
+    fields = (
+        Field("w", MULTIDICT, key=(2, 1)),
+        Field("y", MULTIDICT, key=2, pack=_compact),
+        Field("v", MULTIDICT, key=(2, 1), pack=_compact)
+    )
+
     def __init__(self, w, y, v):
         Serializable.__init__(self)
         self.w = w
@@ -106,23 +120,22 @@ class MaintSolution(Serializable):
             "- v     : %s" % str(self.v)
         ])
 
-    def to_json(self):
-        return self.rep({
-            "w": Multidict(self.w),
-            "y": Multidict(self.y),
-            "v": Multidict(self.v)
-        })
-
-    @staticmethod
-    def from_json(chunk):
-        return MaintSolution(
-            chunk["w"].data,
-            chunk["y"].data,
-            chunk["v"].data
-        )
+    def closed(self, l, threshold=0.5):
+        """
+        The periods with work on link l, as a RunList
+        """
+        return RunList.where(self.y[l], threshold)
 
 
 class CrewSolution(Serializable):
+    variables = ("q", "yk", "vk", "d")
+    fields = (
+        Field("q"),
+        Field("yk"),
+        Field("vk"),
+        Field("d", MULTIDICT, pack=_compact)
+    )
+
     def __init__(self, q, yk, vk, d):
         Serializable.__init__(self)
         self.q = q
@@ -139,25 +152,21 @@ class CrewSolution(Serializable):
             "- d     : %s" % str(self.d),
         ])
 
-    def to_json(self):
-        return self.rep({
-            "q": self.q,
-            "yk": self.yk,
-            "vk": self.vk,
-            "d": Multidict(self.d)
-        })
-
-    @staticmethod
-    def from_json(chunk):
-        return CrewSolution(
-            chunk["q"],
-            chunk["yk"],
-            chunk["vk"],
-            chunk["d"].data
-        )
-
 
 class Solution(Serializable):
+    # the sub-solutions are kept as raw chunks until first accessed when loaded with json_load(f, lazy=True)
+    train_sol = LazyAttribute("train_sol")
+    maint_sol = LazyAttribute("maint_sol")
+    crew_sol = LazyAttribute("crew_sol")
+    fields = (
+        Field("prob"),
+        Field("opt_par"),
+        Field("stat"),
+        Field("train_sol"),
+        Field("maint_sol"),
+        Field("crew_sol")
+    )
+
     def __init__(self, prob, train_sol, maint_sol, crew_sol, opt_par, stat):
         Serializable.__init__(self)
         self.prob = prob
@@ -198,18 +207,18 @@ class Solution(Serializable):
         return "linear" in self.stat and self.stat["linear"]
 
     def info(self):
-        print
-        print "Objective value:", self.obj_val()
-        print "Best bound     :", self.obj_bnd()
-        print
-        print 'Num cancelled trains:', self.num_cancelled()
-        print
-        print "Problem statistics"
-        print "- variables  :", self.num_var()
-        print "- constraints:", self.num_ctr()
-        print "- nodes      :", self.nodes()
-        print "- iterations :", self.iter()
-        print "- time [s]   :", self.time()
+        print()
+        print("Objective value:", self.obj_val())
+        print("Best bound     :", self.obj_bnd())
+        print()
+        print('Num cancelled trains:', self.num_cancelled())
+        print()
+        print("Problem statistics")
+        print("- variables  :", self.num_var())
+        print("- constraints:", self.num_ctr())
+        print("- nodes      :", self.nodes())
+        print("- iterations :", self.iter())
+        print("- time [s]   :", self.time())
 
     def write_statistics(self, filename):
         with open(filename, "a") as fp:
@@ -231,51 +240,88 @@ class Solution(Serializable):
             str(self.crew_sol)
         ])
 
-    def to_json(self):
-        return self.rep({
-            "prob": self.prob,
-            "opt_par": self.opt_par,
-            "stat": self.stat,
-            "train_sol": self.train_sol,
-            "maint_sol": self.maint_sol,
-            "crew_sol": self.crew_sol
-        })
-
     # noinspection PyPep8Naming
-    @staticmethod
-    def from_json(chunk):
+    @classmethod
+    def from_json(cls, chunk):
         old_format = "z" in chunk
-        if old_format:
-            z, ey, ex, eO, eD, f, xy, xx, n0, n1 = (
-                chunk["z"].data,
-                chunk["ey"].data, chunk["ex"].data,
-                chunk["eO"], chunk["eD"], chunk["f"],
-                chunk["xy"].data, chunk["xx"].data,
-                chunk["n0"].data, chunk["n1"].data,
-            )
-            # Was using cumulative variables then, derive u from them
-            u = {}
-            for key in xx.keys():
-                xx0 = [0] + xx[key]
-                u_val = [xy[key][t] - xx0[t] for t in range(len(xy[key]))]
-                u[key] = u_val
-            train_sol = TrainSolution(z, ey, ex, eO, eD, f, xy, xx, u, n0, n1)
-            # Unpack maint_sol
-            maint_sol = MaintSolution.from_json(chunk)
-            crew_sol = None
-        else:
-            train_sol = chunk["train_sol"]
-            maint_sol = chunk["maint_sol"]
-            crew_sol = chunk["crew_sol"]
-
+        if not old_format:
+            return super(Solution, cls).from_json(chunk)
+        z, ey, ex, eO, eD, f, xy, xx, n0, n1 = (
+            chunk["z"].data,
+            chunk["ey"].data, chunk["ex"].data,
+            chunk["eO"], chunk["eD"], chunk["f"],
+            chunk["xy"].data, chunk["xx"].data,
+            chunk["n0"].data, chunk["n1"].data,
+        )
+        # Was using cumulative variables then, derive u from them
+        u = {}
+        for key in xx.keys():
+            xx0 = [0] + xx[key]
+            u_val = [xy[key][t] - xx0[t] for t in range(len(xy[key]))]
+            u[key] = u_val
+        train_sol = TrainSolution(z, ey, ex, eO, eD, f, xy, xx, u, n0, n1)
+        # Unpack maint_sol
+        maint_sol = MaintSolution.from_json(chunk)
         return Solution(
             chunk["prob"],
             train_sol,
             maint_sol,
-            crew_sol,
+            None,
             chunk["opt_par"],
             chunk["stat"]
         )
 
+
+def diff(a, b):
+    """
+    The differences between the solutions a and b, comparing the variables of the train, maintenance
+    and crew solutions key by key
+    :return: dict {(part, variable): {key: (value in a, value in b)}}, with None for missing keys
+    """
+    changes = {}
+    for part in ["train_sol", "maint_sol", "crew_sol"]:
+        sa, sb = getattr(a, part), getattr(b, part)
+        if sa is None and sb is None:
+            continue
+        for var in (sa or sb).variables:
+            va = getattr(sa, var) if sa is not None else {}
+            vb = getattr(sb, var) if sb is not None else {}
+            d = {k: (va.get(k), vb.get(k)) for k in set(va) | set(vb) if k not in va or k not in vb or va[k] != vb[k]}
+            if d:
+                changes[part, var] = d
+    return changes
+
+
+def assign_crews(maint_sol, res, period_lengths):
+    """
+    A greedy crew assignment (a CrewSolution) for the work of maint_sol, period by period. The work of a link
+    gets the first of its crews that is already working in the period, can continue its work within max_work
+    or has rested at least min_rest - otherwise no crew (so the limits hold, except over the end when cyclic)
+    :param res: the resource data (class Resources)
+    :param period_lengths: the length of each period (in time units)
+    """
+    work = {k: [0.0] * len(period_lengths) for k in res.all_crew}
+    d = {}
+    run = dict.fromkeys(res.all_crew, 0.0)  # the length of the current work (or rest, when not working)
+    for t, length in enumerate(period_lengths):
+        def rank(k):
+            if work[k][t]:
+                return 3
+            if t > 0 and work[k][t - 1]:
+                return 2 if run[k] + length <= res.max_work else 0
+            return 1 if run[k] >= res.min_rest or not any(work[k][:t]) else 0
+        for l in sorted(maint_sol.y):
+            if maint_sol.y[l][t] > 0.5 and res.crews.get(l):
+                k = max(res.crews[l], key=lambda k: (rank(k), -res.crews[l].index(k)))
+                if rank(k):
+                    work[k][t] = 1.0
+                    d.setdefault((l, k), [0.0] * len(period_lengths))[t] = 1.0
+        for k in res.all_crew:
+            run[k] = run[k] + length if t == 0 or work[k][t] == work[k][t - 1] else length
+    q = {k: 1.0 if any(w) else 0.0 for k, w in work.items()}
+    vk = {k: [1.0 if v and (t == 0 or not w[t - 1]) else 0.0 for t, v in enumerate(w)] for k, w in work.items()}
+    return CrewSolution(q, work, vk, d)
+
+
 # Convenience list for use when registering in Persist
 types = [Solution, TrainSolution, MaintSolution, CrewSolution]
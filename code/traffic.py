@@ -1,7 +1,17 @@
 """
 Rail traffic data with accompanying methods
 """
-from persist import Serializable, Multidict
+from bisect import bisect_left, bisect_right
+from itertools import chain
+try:
+    from itertools import accumulate
+except ImportError:
+    accumulate = None
+from persist import Serializable, Field, TUPLE, DICT, MULTIDICT
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 __author__ = 'tomas.liden@liu.se'
 
@@ -12,6 +22,19 @@ class Traffic(Serializable):
     min durations etc. In addition the time period definitions and traffic cost parameters
     are stored here
     """
+    fields = (
+        Field("periods", TUPLE),
+        Field("period_starts", TUPLE),
+        Field("period_lengths", TUPLE),
+        Field("trains"),
+        Field("train_routes", DICT, element=tuple),
+        Field("min_link_time", MULTIDICT, key=2, element=tuple),
+        Field("min_node_time", MULTIDICT, key=2),
+        Field("pref_dep"),
+        Field("t_cost"),
+        Field("d_cost"),
+        Field("r_cost", MULTIDICT, key=2)
+    )
 
     def __init__(self, periods, period_starts, period_lengths, trains, train_routes, min_link_time, min_node_time,
                  pref_dep, t_cost, d_cost, r_cost):
@@ -29,27 +52,125 @@ class Traffic(Serializable):
         self.d_cost = d_cost            # deviation cost for train s        - \sigma^d_s
         self.r_cost = r_cost            # route cost per train and route    - \sigma^r_{sr}
         # @formatter:on
+        self.__starts = None    # period boundaries for the overlap queries, set up on first use
+        self.__ends = None
+        self.__min_times = {}   # cumulative min link and node times per (s, r), see min_dur
+        self.__node_trains = None   # the trains with min node times
 
     def scale(self, t_fac, d_fac, r_fac):
-        return Traffic(self.periods, self.period_starts, self.period_lengths, self.trains,
-                       self.train_routes, self.min_link_time, self.min_node_time, self.pref_dep,
-                       {k: t_fac*v for k, v in self.t_cost.items()},
-                       {k: d_fac*v for k, v in self.d_cost.items()},
-                       {k: r_fac*v for k, v in self.r_cost.items()})
+        scaled = Traffic(self.periods, self.period_starts, self.period_lengths, self.trains,
+                         self.train_routes, self.min_link_time, self.min_node_time, self.pref_dep,
+                         {k: t_fac*v for k, v in self.t_cost.items()},
+                         {k: d_fac*v for k, v in self.d_cost.items()},
+                         {k: r_fac*v for k, v in self.r_cost.items()})
+        scaled.__min_times = self.__min_times  # only the costs are scaled
+        scaled.__node_trains = self.__node_trains
+        return scaled
 
     def node_time(self, s, n):
-        return self.min_node_time[s, n] if (s, n) in self.min_node_time else 0
+        return self.min_node_time.get((s, n), 0)
 
     def min_dur(self, s, r, route_nodes, num_links=-1):
-        to = num_links if num_links > 0 else len(route_nodes) - 1
-        return sum(self.min_link_time[s, r][:to]) + sum([self.node_time(s, n) for n in route_nodes[:to]])
+        """
+        Min duration for train s on route r (with the given nodes), over the first num_links links or the whole route.
+        The cumulative times are set up once per (s, r) and route_nodes object, so the min_link_time and
+        min_node_time should not be changed after the first call.
+        """
+        nodes, link_times, node_times = self.__prefix_times(s, r, route_nodes)
+        to = num_links if num_links > 0 else len(nodes) - 1
+        dur = link_times[self.__prefix_len(len(link_times) - 1, to)]
+        return dur + node_times[self.__prefix_len(len(node_times) - 1, to)] if node_times else dur
+
+    def __prefix_times(self, s, r, route_nodes):
+        times = self.__min_times.get((s, r))
+        if times is None or times[0] is not route_nodes:
+            if self.__node_trains is None:
+                self.__node_trains = set(k[0] for k in self.min_node_time)
+            node_times = None  # i.e. all zero
+            if s in self.__node_trains:
+                node_times = self.__cumulative([self.node_time(s, n) for n in route_nodes])
+            times = (route_nodes, self.__cumulative(self.min_link_time[s, r]), node_times)
+            self.__min_times[s, r] = times
+        return times
+
+    @staticmethod
+    def __cumulative(values):
+        if accumulate is not None:
+            return list(accumulate(chain([0], values)))
+        acc = [0]
+        for v in values:
+            acc.append(acc[-1] + v)
+        return acc
+
+    @staticmethod
+    def __prefix_len(n, to):
+        # the length of values[:to] for n values
+        return min(to, n) if to >= 0 else max(n + to, 0)
 
     def periods_overlapping(self, a, b, cyclic=False):
+        """
+        The periods overlapping the time interval (a, b), in period order.
+        With cyclic=True the parts of the interval outside the planning horizon are wrapped around.
+        """
+        assert a <= b
+        if not self.__indexed():
+            return self.__scan(a, b, cyclic)
+        return (self.periods[i] for i in self.__positions(*self.__bounds(a, b, cyclic)))
+
+    def periods_overlapping_batch(self, intervals, cyclic=False):
+        """
+        The overlapping periods (as lists) for each of the intervals (a, b) - see periods_overlapping
+        """
+        if not self.__indexed():
+            return [list(self.__scan(a, b, cyclic)) for a, b in intervals]
+        if np is None or not len(intervals):
+            return [list(self.periods_overlapping(a, b, cyclic)) for a, b in intervals]
+        a, b = np.asarray(intervals, dtype=float).reshape(-1, 2).T
+        assert (a <= b).all()
+        bounds = [np.searchsorted(self.__ends, a, "right"), np.searchsorted(self.__starts, b, "left")]
+        if cyclic:
+            h = self.__ends[-1] - self.__starts[0]
+            num = len(self.periods)
+            bounds.append(np.where(a < self.__starts[0], np.searchsorted(self.__ends, a + h, "right"), num))
+            bounds.append(np.where(b > self.__ends[-1], np.searchsorted(self.__starts, b - h, "left"), 0))
+        return [[self.periods[i] for i in self.__positions(*bnd)] for bnd in zip(*[x.tolist() for x in bounds])]
+
+    def __indexed(self):
+        # the boundary index requires the periods to be ordered in time, without overlaps
+        if self.__starts is None:
+            b_t = self.period_starts
+            d_t = self.period_lengths
+            self.__starts = [b_t[t] for t in self.periods]
+            self.__ends = [b_t[t] + d_t[t] for t in self.periods]
+            if not all(e <= s for e, s in zip(self.__ends, self.__starts[1:])):
+                self.__starts = self.__ends = ()
+        return len(self.__starts) > 0
+
+    def __bounds(self, a, b, cyclic):
+        starts = self.__starts
+        ends = self.__ends
+        lo, hi = bisect_right(ends, a), bisect_left(starts, b)
+        if not cyclic:
+            return lo, hi
+        h = ends[-1] - starts[0]
+        wrap_lo = bisect_right(ends, a + h) if a < starts[0] else len(ends)
+        wrap_hi = bisect_left(starts, b - h) if b > ends[-1] else 0
+        return lo, hi, wrap_lo, wrap_hi
+
+    def __positions(self, lo, hi, wrap_lo=None, wrap_hi=0):
+        # the union of the position ranges [0, wrap_hi), [lo, hi) and [wrap_lo, T), in order (lo <= wrap_lo)
+        ranges = [(0, wrap_hi), (lo, hi)] + ([] if wrap_lo is None else [(wrap_lo, len(self.periods))])
+        done = 0
+        for i, j in ranges:
+            for k in range(max(i, done), j):
+                yield k
+            done = max(done, j)
+
+    def __scan(self, a, b, cyclic):
         b_t = self.period_starts
         d_t = self.period_lengths
         min_t = b_t[0]
         max_t = b_t[-1] + d_t[-1]
-        assert a <= b
         if not cyclic:
             return (t for t in self.periods if a < b_t[t] + d_t[t] and b_t[t] < b)
         else:
@@ -58,7 +179,6 @@ class Traffic(Serializable):
                     if (a < b_t[t] + d_t[t] or b > max_t and b_t[t] < b - h)
                     and (b_t[t] < b or a < min_t and a + h < b_t[t] + d_t[t]))
 
-
     def __str__(self):
         return "\n".join([
             "Preferred dep : %s" % str(self.pref_dep),
@@ -71,34 +191,3 @@ class Traffic(Serializable):
             "Deviation cost: %s" % str(self.d_cost),
             "Route cost    : %s" % str(self.r_cost)
         ])
-
-    def to_json(self):
-        return self.rep({
-            "periods": self.periods,
-            "period_starts": self.period_starts,
-            "period_lengths": self.period_lengths,
-            "trains": self.trains,
-            "train_routes": self.train_routes,
-            "min_link_time": Multidict(self.min_link_time),
-            "min_node_time": Multidict(self.min_node_time),
-            "pref_dep": self.pref_dep,
-            "t_cost": self.t_cost,
-            "d_cost": self.d_cost,
-            "r_cost": Multidict(self.r_cost)
-        })
-
-    @staticmethod
-    def from_json(chunk):
-        return Traffic(
-            tuple(chunk["periods"]),
-            tuple(chunk["period_starts"]),
-            tuple(chunk["period_lengths"]),
-            chunk["trains"],
-            {k: tuple(v) for k, v in chunk["train_routes"].items()},
-            {k: tuple(v) for k, v in chunk["min_link_time"].data.items()},
-            chunk["min_node_time"].data,
-            chunk["pref_dep"],
-            chunk["t_cost"],
-            chunk["d_cost"],
-            chunk["r_cost"].data
-        )
@@ -14,27 +14,27 @@ class TrainSets:
     def setup(network, traffic, dt):
         nw = network
         tr = traffic
-        b_t = tr.period_starts
-        d_t = tr.period_lengths
-        tr_periods = {}
-        tr_links = {}
-        tr_dirs = {}
+        # direction per route and link, for the first position of the link in the route
+        route_dirs = {}
+        for r, links in nw.route_links.items():
+            route_dirs[r] = {}
+            for i, l in enumerate(links):
+                route_dirs[r].setdefault(l, nw.route_dirs[r][i])
+        windows = []
         for s in tr.trains:
             dur = max([tr.min_dur(s, r, nw.route_nodes[r]) for r in tr.train_routes[s]])
-            lb = tr.pref_dep[s] - dt
-            ub = tr.pref_dep[s] + dur + dt
-            tr_periods[s] = [t for t in tr.periods if b_t[t] < ub and b_t[t] + d_t[t] > lb]
-
+            windows.append((tr.pref_dep[s] - dt, tr.pref_dep[s] + dur + dt))
+        tr_periods = dict(zip(tr.trains, tr.periods_overlapping_batch(windows)))
+        tr_links = {}
+        tr_dirs = {l: {} for l in nw.links}
+        for s in tr.trains:
             tr_links[s] = set(l for r in tr.train_routes[s] for l in nw.route_links[r])
-        for l in nw.links:
-            train_dirs_over_l = {}
-            routes_over_l = [r for r in nw.route_links if l in nw.route_links[r]]
-            for s in tr.trains:
-                dirs_over_l = [nw.route_dirs[r][nw.route_links[r].index(l)]
-                               for r in tr.train_routes[s] if r in routes_over_l]
-                assert len(set(dirs_over_l)) <= 1, \
-                    "This model cannot handle multiple link directions per train - as for %s" % s
-                if len(dirs_over_l) > 0:
-                    train_dirs_over_l[s] = dirs_over_l[0]
-            tr_dirs[l] = train_dirs_over_l
+            dirs_over = {}
+            for r in tr.train_routes[s]:
+                for l, d in route_dirs[r].items():
+                    assert dirs_over.setdefault(l, d) == d, \
+                        "This model cannot handle multiple link directions per train - as for %s" % s
+            for l, d in dirs_over.items():
+                if l in tr_dirs:
+                    tr_dirs[l][s] = d
         return TrainSets(tr_periods, tr_links, tr_dirs)